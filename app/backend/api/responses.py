@@ -0,0 +1,114 @@
+"""
+Encoding of the API responses: JSON, or MessagePack for the clients asking for it.
+
+'APIResponse' is the default response class of the application. It encodes JSON with
+orjson, which is several times faster than the standard library and produces the same
+compact output. A client sending 'Accept: application/msgpack' gets the same content
+as MessagePack instead, which is smaller and faster to decode.
+
+The media type is negotiated once per request, by the ContentNegotiationMiddleware,
+and read from 'response_media_type' when the response is rendered.
+
+orjson and msgpack are optional: without orjson, JSON is encoded with the standard
+library, and without msgpack, only JSON is offered.
+"""
+
+import json
+from contextvars import ContextVar
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional.
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional.
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Media types in order of server preference, when the client has no preference:
+AVAILABLE_MEDIA_TYPES = tuple(
+    media_type
+    for media_type, available in (
+        (JSON_MEDIA_TYPE, True),
+        (MSGPACK_MEDIA_TYPE, msgpack is not None),
+    )
+    if available
+)
+
+# Media type of the responses of the current request:
+response_media_type: ContextVar[str] = ContextVar(
+    "response_media_type", default=JSON_MEDIA_TYPE
+)
+
+
+def encode_value(value: Any) -> Any:
+    """Convert a value the encoders don't support natively."""
+    if isinstance(value, Enum):
+        return value.value
+    # MessagePack has no date type: dates are sent as ISO strings, as in JSON.
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+def encode_json(content: Any) -> bytes:
+    """Encode content as compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=encode_value)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=encode_value,
+    ).encode("utf-8")
+
+
+def encode_msgpack(content: Any) -> bytes:
+    """Encode content as MessagePack."""
+    return msgpack.packb(content, default=encode_value)
+
+
+class APIResponse(JSONResponse):
+    """
+    A response encoded in the media type negotiated for the request: JSON, or
+    MessagePack.
+
+    The content is encoded as is: it must already be made of JSON types (plus dates and
+    enums), e.g. rows of selected columns, or the output of a response model.
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers=None,
+        media_type: str | None = None,
+        background=None,
+    ):
+        super().__init__(
+            content,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type or response_media_type.get(),
+            background=background,
+        )
+        if len(AVAILABLE_MEDIA_TYPES) > 1:
+            # The same URL has several representations:
+            self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return encode_msgpack(content)
+        return encode_json(content)
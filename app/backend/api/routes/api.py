@@ -3,6 +3,7 @@ from fastapi import APIRouter
 # FastAPI routes for APIs
 from app.backend.auth.routes import router as auth_routes
 from app.backend.customer.routes import router as customer_routes
+from app.backend.monitoring.routes import router as monitoring_routes
 
 # Swagger
 from app.backend.swagger.swagger_ui import router as swagger_ui_routes
@@ -15,5 +16,6 @@ router = APIRouter()
 # Include the routers:
 router.include_router(customer_routes)
 router.include_router(auth_routes)
+router.include_router(monitoring_routes)
 router.include_router(about_routes)
 router.include_router(swagger_ui_routes)
@@ -8,7 +8,8 @@ from sqlmodel import Field, SQLModel
 class User(SQLModel, table=True):
     id: int = Field(primary_key=True)
     name: str
-    email: EmailStr
+    # Unique index: looked up by every authentication.
+    email: EmailStr = Field(unique=True, index=True)
     password: str
     active: bool = True
 
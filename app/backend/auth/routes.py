@@ -3,6 +3,8 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, String, asc, cast, desc, or_, select
 
 from app.backend.auth.auth import (
@@ -162,10 +164,12 @@ def add_users(users: List[User], session: Session = Depends(get_session)):
 
 @router.delete("/users/{user_id}", response_model=dict, tags=["User"])
 def delete_user(user_id: int, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
-    if not user:
+    # A single DELETE ... RETURNING, instead of a SELECT then a DELETE:
+    deleted_id = session.scalars(
+        delete(User).where(User.id == user_id).returning(User.id)
+    ).one_or_none()
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="User not found")
-    session.delete(user)
     session.commit()
     return {"detail": "User deleted successfully"}
 
@@ -174,19 +178,45 @@ def delete_user(user_id: int, session: Session = Depends(get_session)):
 def update_user(
     user_id: int, user_update: UserUpdate, session: Session = Depends(get_session)
 ):
-    user = session.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     update_data = user_update.dict(exclude_unset=True)
 
     # If a new password is provided, hash it before saving
     if "password" in update_data and update_data["password"]:
         update_data["password"] = get_password_hash(update_data["password"])
 
-    for key, value in update_data.items():
-        setattr(user, key, value)
+    # Check if another user already has the new email (emails are unique).
+    if update_data.get("email") is not None:
+        existing_user = session.exec(
+            select(User).where(User.email == update_data["email"], User.id != user_id)
+        ).first()
+        if existing_user:
+            raise HTTPException(
+                status_code=400,
+                detail=f"User email {update_data['email']} already exists",
+            )
+
+    if not update_data:
+        user = session.get(User, user_id)
+    else:
+        # A single UPDATE ... RETURNING, instead of a SELECT then an UPDATE:
+        try:
+            user = session.scalars(
+                update(User)
+                .where(User.id == user_id)
+                .values(**update_data)
+                .returning(User)
+            ).one_or_none()
+        except IntegrityError:
+            # The email was taken by a concurrent request, after the check above:
+            session.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"User email {update_data['email']} already exists",
+            )
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    session.add(user)
+    # Keep the returned values, which the commit would expire and reload:
+    session.expunge(user)
     session.commit()
-    return {"detail": "User updated successfully"}
+    return user
@@ -0,0 +1,67 @@
+"""
+Change sequence of the customer table.
+
+Every write to a customer row stamps it with the next value of a monotonically
+increasing sequence, and every deletion leaves a tombstone with its sequence.
+Clients that know the sequence of their data can then fetch only what changed.
+"""
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from app.backend.customer.models import ChangeSequence, CustomerTombstone
+
+
+def next_change_seq(session: Session, count: int = 1) -> int:
+    """
+    Allocate 'count' values of the change sequence, in the current transaction.
+
+    Args:
+        session (Session): The session of the write.
+        count (int): The number of values to allocate.
+
+    Returns:
+        int: The last allocated value. The allocated values are (last - count, last].
+    """
+    # One atomic statement, so concurrent workers never get the same values:
+    return session.exec(
+        text(
+            "INSERT INTO change_sequence (id, value) VALUES (1, :count) "
+            "ON CONFLICT (id) DO UPDATE SET value = value + :count "
+            "RETURNING value"
+        ).bindparams(count=count)
+    ).scalar_one()
+
+
+def current_change_seq(session: Session) -> int:
+    """Return the latest value of the change sequence."""
+    return session.exec(select(ChangeSequence.value)).first() or 0
+
+
+def add_tombstone(session: Session, customer_id: int, seq: int):
+    """Record the deletion of a customer."""
+    add_tombstones(session, [customer_id], seq)
+
+
+def add_tombstones(session: Session, customer_ids: list, first_seq: int):
+    """Record the deletion of customers, with consecutive sequences from 'first_seq'."""
+    if not customer_ids:
+        return
+    query = insert(CustomerTombstone)
+    session.execute(
+        query.on_conflict_do_update(
+            index_elements=["id"], set_={"seq": query.excluded.seq}
+        ),
+        [
+            {"id": customer_id, "seq": seq}
+            for seq, customer_id in enumerate(customer_ids, start=first_seq)
+        ],
+    )
+
+
+def remove_tombstones(session: Session, customer_ids: list):
+    """Forget the deletion of customers whose ids are used again."""
+    session.exec(
+        delete(CustomerTombstone).where(CustomerTombstone.id.in_(customer_ids))
+    )
@@ -0,0 +1,116 @@
+"""
+In-process broadcaster of customer changes, for the Server-Sent Events endpoint.
+
+The write routes publish the change sequence of each committed write. Subscribers
+only receive the latest sequence, not the changed rows: they fetch those from
+'/customers/changes', so a subscriber that falls behind never loses a change.
+
+Each worker process has its own broadcaster. A single watcher task per worker
+also polls the change sequence, so that subscribers see the writes made by the
+other workers, at the cost of one small query per interval.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+from typing import Optional
+
+import anyio.to_thread
+from sqlmodel import Session
+
+from app.backend.customer.changes import current_change_seq
+from app.backend.database.utils import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Change sequences waiting for each subscriber. Older ones are dropped when it is full:
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("CHANGE_EVENTS_QUEUE_SIZE", "16"))
+
+# Interval at which the change sequence is read from the database, for the writes
+# made by other workers, in seconds:
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_EVENTS_POLL_INTERVAL", "2"))
+
+
+class ChangeBroadcaster:
+    """Fan out the change sequence of the customer table to the subscribers of this worker."""
+
+    def __init__(
+        self,
+        queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+        poll_interval: float = CHANGE_POLL_INTERVAL,
+    ):
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.seq = 0
+        self._subscribers: set = set()
+        self._lock = threading.Lock()
+        self._engine = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    def publish(self, seq: int):
+        """
+        Notify the subscribers that the data changed, up to 'seq'.
+
+        Thread-safe: the synchronous routes call it from the threadpool.
+        """
+        with self._lock:
+            if seq <= self.seq:
+                return
+            self.seq = seq
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, seq)
+            except RuntimeError:
+                # The loop of the subscriber is closed.
+                pass
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, seq: int):
+        if queue.full():
+            # A slow subscriber only needs the latest sequence:
+            queue.get_nowait()
+        queue.put_nowait(seq)
+
+    def read_seq(self) -> int:
+        """Read the latest change sequence from the database (blocking)."""
+        if self._engine is None:
+            self._engine = get_engine()
+            # Don't log a query every poll interval:
+            self._engine.echo = False
+        with Session(self._engine) as session:
+            return current_change_seq(session)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        """
+        Subscribe to the changes, for the duration of the context.
+
+        Yields:
+            asyncio.Queue: The queue receiving the change sequences.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    async def _watch(self):
+        """Publish the writes of the other workers, while there are subscribers."""
+        while self._subscribers:
+            try:
+                self.publish(await anyio.to_thread.run_sync(self.read_seq))
+            except Exception:
+                logger.exception("Error reading the customer change sequence")
+            await asyncio.sleep(self.poll_interval)
+
+
+customer_changes = ChangeBroadcaster()
@@ -1,10 +1,13 @@
+import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Index, SQLModel
 
+from app.backend.database.types import EnumCode, EpochDays
 
-# Define Enum for valid Statuses
+
+# Define Enum for valid Statuses. Stored as codes: only add new ones at the end.
 class StatusDescription(Enum):
     Delivered = "Delivered"
     Pending = "Pending"
@@ -18,30 +21,152 @@ class SortBy(Enum):
 
 # SQLModel setup
 class Customer(SQLModel, table=True):
+    __table_args__ = (
+        # Covers the date ranges of /customers/stats, which then never read the table:
+        Index("ix_customer_stats", "date", "payments", "status"),
+        # Status filters, alone or with a date range:
+        Index("ix_customer_status_date", "status", "date"),
+    )
+
     id: int = Field(primary_key=True)
-    name: str
+    # Indexed for the sorts and filters of the table. The sorts on date use the stats
+    # index, and the order of equal values (by id) comes with every index:
+    name: str = Field(index=True)
     email: str
     phone: str
     address: str
-    date: str
-    payments: float
-    status: StatusDescription
+    # Stored as integers, but sent as 'YYYY-MM-DD' dates and status names:
+    date: datetime.date = Field(sa_type=EpochDays)
+    payments: float = Field(index=True)
+    status: StatusDescription = Field(sa_type=EnumCode(StatusDescription))
+    # Change sequence of the last write to the row, set by the API:
+    seq: int = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
+    # Incremented by every update, for the 'If-Match' precondition of the updates:
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    # Hash of the upserted values, to skip unchanged rows. Updates clear it. Internal:
+    # never sent in responses.
+    content_hash: Optional[str] = Field(default=None, exclude=True)
 
     # Config class to use enum values
     class Config:
         use_enum_values = True
 
 
+# Deleted customers, kept so that /customers/changes can report the deletion
+class CustomerTombstone(SQLModel, table=True):
+    id: int = Field(primary_key=True)
+    seq: int = Field(index=True)
+
+
+# Single-row counter of the customer change sequence
+class ChangeSequence(SQLModel, table=True):
+    __tablename__ = "change_sequence"
+
+    id: int = Field(default=1, primary_key=True)
+    value: int = 0
+
+
 # Customer update model
 class CustomerUpdate(SQLModel):
     name: Optional[str] = None
     email: Optional[str] = None
     phone: Optional[str] = None
     address: Optional[str] = None
-    date: Optional[str] = None
+    date: Optional[datetime.date] = None
     payments: Optional[float] = None
     status: Optional[StatusDescription] = None
 
     # Config class to use enum values
     class Config:
         use_enum_values = True
+
+
+# Partial update of one customer, in a bulk update
+class CustomerPatch(CustomerUpdate):
+    id: int
+
+
+# Customers selected by a listing, or by a bulk update or delete
+class CustomerFilter(SQLModel):
+    search: Optional[str] = None
+    status: Optional[StatusDescription] = None
+    date_from: Optional[datetime.date] = None
+    date_to: Optional[datetime.date] = None
+    min_payment: Optional[float] = None
+    max_payment: Optional[float] = None
+
+    # Config class to use enum values
+    class Config:
+        use_enum_values = True
+
+
+# Bulk update: either a list of partial updates, or a filter and the update to apply
+class CustomerBulkUpdate(SQLModel):
+    customers: Optional[List[CustomerPatch]] = None
+    filter: Optional[CustomerFilter] = None
+    patch: Optional[CustomerUpdate] = None
+
+
+# Bulk delete: either a list of ids, or a filter
+class CustomerBulkDelete(SQLModel):
+    ids: Optional[List[int]] = None
+    filter: Optional[CustomerFilter] = None
+
+
+# Result of a bulk update or delete
+class CustomerBulkResult(SQLModel):
+    affected: int
+    # Requested ids matching no customer:
+    not_found: List[int] = []
+    # Change sequence of the last affected customer, or the current one:
+    seq: int
+
+
+# Result of an upsert
+class CustomerUpsertResult(SQLModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Change sequence of the last written customer, or the current one:
+    seq: int = 0
+
+
+# Dashboard values of a period
+class MonthValues(SQLModel):
+    num_customers: int = 0
+    total_payments: float = 0.0
+    num_delivers: int = 0
+
+
+class CustomerStats(SQLModel):
+    current: MonthValues
+    previous: MonthValues
+
+
+# Number of customers with a value of a facet
+class FacetCount(SQLModel):
+    value: str
+    count: int
+
+
+# Number of customers with payments in [min_payment, max_payment)
+class PaymentBandCount(SQLModel):
+    min_payment: float
+    max_payment: float
+    count: int
+
+
+# Number of matching customers per status, month and payment band
+class CustomerFacets(SQLModel):
+    total: int
+    statuses: List[FacetCount]
+    months: List[FacetCount]
+    payment_bands: List[PaymentBandCount]
+
+
+# Customers changed or deleted since a given change sequence
+class CustomerChanges(SQLModel):
+    seq: int
+    changed: List[Customer]
+    deleted: List[int]
+    has_more: bool = False
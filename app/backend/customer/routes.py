@@ -1,29 +1,99 @@
-from typing import List, Optional
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, String, asc, cast, desc, or_, select
+import anyio.to_thread
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, type_coerce, update
+from sqlmodel import (
+    Integer,
+    Session,
+    String,
+    and_,
+    asc,
+    case,
+    cast,
+    desc,
+    func,
+    or_,
+    select,
+)
 
+from app.backend.api.responses import APIResponse
+from app.backend.customer.changes import (
+    add_tombstone,
+    add_tombstones,
+    current_change_seq,
+    next_change_seq,
+    remove_tombstones,
+)
+from app.backend.customer.events import customer_changes
 from app.backend.customer.models import (
     Customer,
+    CustomerBulkDelete,
+    CustomerBulkResult,
+    CustomerBulkUpdate,
+    CustomerChanges,
+    CustomerFacets,
+    CustomerFilter,
+    CustomerStats,
+    CustomerTombstone,
     CustomerUpdate,
+    CustomerUpsertResult,
+    FacetCount,
+    MonthValues,
+    PaymentBandCount,
+    StatusDescription,
 )
+from app.backend.customer.sync import (
+    UPSERT_CHUNK_SIZE,
+    content_hash,
+    upsert_customer_rows,
+)
+from app.backend.database.batching import run_write
+from app.backend.database.types import EnumCode, EpochDays
 from app.backend.database.utils import get_session
 
 router = APIRouter(prefix="/api")
 
+# Interval of the comments keeping idle event streams open through proxies, in seconds:
+EVENTS_KEEPALIVE_INTERVAL = 15
 
-# API endpoints
-@router.get("/customers", response_model=List[Customer], tags=["Customer"])
-async def get_customers(
-    session: Session = Depends(get_session),
-    search: Optional[str] = None,
-    sort_by: Optional[str] = None,
-    sort_order: str = "asc",
-):
-    query = select(Customer)
+# Statuses are stored as codes, in the order of the enum. They are sorted by name, as
+# when they were stored as text:
+STATUS_SORT_KEY = case(
+    {
+        code: rank
+        for rank, (status, code) in enumerate(
+            sorted(Customer.__table__.c.status.type.codes().items())
+        )
+    },
+    value=type_coerce(Customer.status, Integer),
+)
 
+
+def search_customers(query, search: Optional[str]):
+    """Filter a customer query on a case-insensitive search string."""
     if search:
         search_filter = f"%{search}%"
+        # Statuses are stored as codes: the matching names are found here.
+        statuses = [
+            status
+            for status in StatusDescription
+            if search.lower() in status.value.lower()
+        ]
         query = query.where(
             or_(
                 Customer.name.ilike(search_filter),
@@ -31,75 +101,799 @@ async def get_customers(
                 Customer.phone.ilike(search_filter),
                 Customer.address.ilike(search_filter),
                 cast(Customer.payments, String).ilike(search_filter),
-                Customer.status.ilike(search_filter),
+                Customer.status.in_(statuses),
             )
         )
+    return query
+
+
+def apply_customer_filter(query, customer_filter: CustomerFilter):
+    """
+    Filter a customer query (a select, update or delete) on a search string, a status,
+    and ranges of dates and payments (inclusive), which can use the indexes.
+    """
+    query = search_customers(query, customer_filter.search)
+    if customer_filter.status is not None:
+        query = query.where(Customer.status == customer_filter.status)
+    if customer_filter.date_from is not None:
+        query = query.where(Customer.date >= customer_filter.date_from)
+    if customer_filter.date_to is not None:
+        query = query.where(Customer.date <= customer_filter.date_to)
+    if customer_filter.min_payment is not None:
+        query = query.where(Customer.payments >= customer_filter.min_payment)
+    if customer_filter.max_payment is not None:
+        query = query.where(Customer.payments <= customer_filter.max_payment)
+    return query
+
+
+def filter_customers(query, customer_filter: CustomerFilter):
+    """
+    Filter a customer query (a select, update or delete) for a bulk operation.
+
+    Raises:
+        HTTPException: 400 if the filter is empty, as it would select every customer.
+    """
+    criteria = customer_filter.dict(exclude_none=True)
+    if not criteria.pop("search", None) and not criteria:
+        raise HTTPException(status_code=400, detail="The filter selects every customer")
+    return apply_customer_filter(query, customer_filter)
+
+
+def customer_columns(fields: Optional[str]) -> list:
+    """
+    Return the customer columns of a comma-separated list of fields, or all of them.
+
+    The internal columns, excluded from the responses, are never selected.
+
+    Raises:
+        HTTPException: 400 if a field is not a customer column.
+    """
+    table = Customer.__table__
+    public = [
+        column
+        for column in table.columns
+        if not Customer.model_fields[column.name].exclude
+    ]
+    if not fields:
+        return public
+
+    columns = []
+    for name in fields.split(","):
+        column = table.columns.get(name.strip())
+        if column not in public:
+            raise HTTPException(400, f"Invalid field: {name.strip()}")
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def encode_column(column, values) -> list:
+    """Convert the values of a customer column to their JSON values."""
+    # Stored as integers, but sent as 'YYYY-MM-DD' dates and status names:
+    if isinstance(column.type, EpochDays):
+        return [value.isoformat() for value in values]
+    if isinstance(column.type, EnumCode):
+        return [value.value for value in values]
+    return list(values)
+
+
+def customer_content(columns: list, rows: list, response_format: str = "rows"):
+    """
+    Convert rows of customer columns to the content of a response, without validating
+    them.
+
+    Args:
+        columns (list): The selected columns.
+        rows (list): The selected rows.
+        response_format (str): 'rows' for one object per customer, or 'columnar' for
+            one array per column.
+    """
+    names = [column.name for column in columns]
+    # The values of each column are converted together:
+    values = [
+        encode_column(column, column_values)
+        for column, column_values in zip(columns, list(zip(*rows)) or [()] * len(names))
+    ]
+    if response_format == "columnar":
+        return {"count": len(rows), "columns": dict(zip(names, values))}
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def patch_values(patch: CustomerUpdate) -> dict:
+    """Return the values set by a partial update of a customer."""
+    return patch.dict(exclude_unset=True, exclude={"id"})
+
+
+def update_customer_rows(session: Session, selection, values: dict, base_seq: int):
+    """
+    Update the customers of a selection, in a single UPDATE ... FROM statement.
+
+    Each updated customer gets its own change sequence, 'base_seq' plus its row number,
+    so that '/customers/changes' can still page through them. The sequence values must
+    be allocated afterwards, in the same transaction.
+
+    Args:
+        session (Session): The session of the write.
+        selection (Callable): Filter a select of the customers to update.
+        values (dict): The values to set.
+        base_seq (int): The change sequence before the first updated customer.
+
+    Returns:
+        List[int]: The ids of the updated customers.
+    """
+    numbered = selection(
+        select(
+            Customer.id, func.row_number().over(order_by=Customer.id).label("number")
+        )
+    ).subquery()
+    return session.scalars(
+        update(Customer)
+        .where(Customer.id == numbered.c.id)
+        .values(
+            **values,
+            seq=base_seq + numbered.c.number,
+            version=Customer.version + 1,
+            content_hash=None,
+        )
+        .returning(Customer.id)
+    ).all()
+
+
+def parse_customer(data, index: int) -> Customer:
+    """Validate a customer of a request, at 'index' in the body."""
+    try:
+        if isinstance(data, (bytes, str)):
+            data = json.loads(data)
+        return Customer.model_validate(data)
+    except ValueError as e:
+        errors = getattr(e, "errors", None)
+        if errors is None:
+            errors = [{"type": "json_invalid", "loc": (), "msg": str(e)}]
+        else:
+            errors = errors()
+        raise RequestValidationError(
+            [{**error, "loc": ("body", index, *error["loc"])} for error in errors]
+        )
+
+
+async def read_customer_chunks(
+    request: Request, chunk_size: int
+) -> AsyncIterator[List[Customer]]:
+    """
+    Read the customers of an upsert request, in chunks of distinct ids.
+
+    A JSON array is parsed at once. Newline-delimited JSON ('application/x-ndjson', one
+    customer per line) is parsed as it is received, so that the first chunks are
+    written while the rest of the body is still streaming in. In a chunk, the last
+    customer with a given id wins.
+    """
+    chunk = {}
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index, buffer = 0, b""
+        async for data in request.stream():
+            *lines, buffer = (buffer + data).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    customer = parse_customer(line, index)
+                    chunk[customer.id] = customer
+                    if len(chunk) >= chunk_size:
+                        yield list(chunk.values())
+                        chunk = {}
+                index += 1
+        if buffer.strip():
+            customer = parse_customer(buffer, index)
+            chunk[customer.id] = customer
+    else:
+        try:
+            body = await request.json()
+        except ValueError as e:
+            raise RequestValidationError(
+                [{"type": "json_invalid", "loc": ("body",), "msg": str(e)}]
+            )
+        if not isinstance(body, list):
+            raise RequestValidationError(
+                [{"type": "list_type", "loc": ("body",), "msg": "Expected a list"}]
+            )
+        for index, data in enumerate(body):
+            customer = parse_customer(data, index)
+            chunk[customer.id] = customer
+            if len(chunk) >= chunk_size:
+                yield list(chunk.values())
+                chunk = {}
+    if chunk:
+        yield list(chunk.values())
+
+
+def customer_etag(customer: Customer) -> str:
+    """The entity tag of a customer, from its version."""
+    return f'"{customer.version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[List[int]]:
+    """
+    Parse the versions allowed by an 'If-Match' header.
+
+    The header is a comma-separated list of entity tags, and the customer matches if
+    its version is any of them. If-Match uses the strong comparison: the weak tags
+    ('W/"3"') match no version, and if all tags are weak, the update fails with 412.
+
+    Returns:
+        Optional[List[int]]: The versions, or None if any version matches ('*' or no
+            header).
+
+    Raises:
+        HTTPException: 400 if a tag is not a customer version.
+    """
+    if if_match is None:
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return None
+        weak = tag.startswith("W/")
+        tag = tag.removeprefix("W/").strip('"')
+        if not tag.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid If-Match header")
+        if not weak:
+            versions.append(int(tag))
+    return versions
+
+
+def change_event(seq: int) -> str:
+    """Format a change sequence as a Server-Sent Event."""
+    return f"event: change\nid: {seq}\ndata: {json.dumps({'seq': seq})}\n\n"
+
+
+# API endpoints
+@router.get("/customers", response_model=List[Customer], tags=["Customer"])
+def get_customers(
+    response: Response,
+    session: Session = Depends(get_session),
+    customer_filter: CustomerFilter = Depends(),
+    sort_by: Optional[str] = None,
+    sort_order: str = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    response_format: Literal["rows", "columnar"] = Query("rows", alias="format"),
+):
+    """
+    List customers.
+
+    The customers can be filtered on a search string, a status, and ranges of dates
+    ('date_from', 'date_to') and payments ('min_payment', 'max_payment'), inclusive.
+
+    With 'limit', only one page of customers is returned, and the total number of
+    matching customers is sent in the 'X-Total-Count' header.
+
+    The change sequence of the data is sent in the 'X-Change-Seq' header, to fetch
+    later changes from '/customers/changes'.
+
+    'fields' selects only some columns, e.g. 'fields=id,name,status'. With
+    'format=columnar', the customers are sent as one array per column instead of one
+    object per customer: '{"count": 2, "columns": {"id": [1, 2], "name": [...]}}'.
+
+    The customers are encoded directly from the selected columns, without validation.
+    """
+    # Read before the rows: changes made in between are sent again later, not missed.
+    response.headers["X-Change-Seq"] = str(current_change_seq(session))
+
+    columns = customer_columns(fields)
+    query = apply_customer_filter(select(*columns), customer_filter)
 
     if sort_by:
         column = getattr(Customer, sort_by, None)
         if not column:
             raise HTTPException(400, "Invalid sort column")
+        if sort_by == "status":
+            column = STATUS_SORT_KEY
         query = query.order_by(desc(column) if sort_order == "desc" else asc(column))
 
-    return session.exec(query).all()
+    # Order by id too, so that pages are stable when sort values are equal, and so that
+    # the order doesn't depend on the index SQLite picks for the selected columns:
+    query = query.order_by(Customer.id)
+
+    if limit is not None:
+        count_query = apply_customer_filter(
+            select(func.count()).select_from(Customer), customer_filter
+        )
+        response.headers["X-Total-Count"] = str(session.exec(count_query).one())
+        query = query.offset(offset).limit(limit)
+
+    # 'execute' returns rows even for a single column, where 'exec' returns scalars:
+    content = customer_content(columns, session.execute(query).all(), response_format)
+    # The headers set above are not added to a returned response:
+    return APIResponse(content, headers=dict(response.headers))
+
+
+@router.get("/customers/stats", response_model=CustomerStats, tags=["Customer"])
+def get_customer_stats(
+    response: Response,
+    session: Session = Depends(get_session),
+    search: Optional[str] = None,
+):
+    """
+    Dashboard values of the customers matching a search, in a single aggregate query.
+
+    'current' covers the customers since the start of the year, and 'previous' the
+    customers of the month before it. The change sequence of the data is sent in the
+    'X-Change-Seq' header.
+    """
+    response.headers["X-Change-Seq"] = str(current_change_seq(session))
+
+    now = datetime.now()
+    start_of_month = datetime(now.year, 1, 1)
+    last_day_of_last_month = start_of_month - timedelta(days=1)
+    start_of_last_month = datetime(
+        last_day_of_last_month.year, last_day_of_last_month.month, 1
+    )
+
+    periods = {
+        "current": Customer.date >= start_of_month.date(),
+        "previous": and_(
+            Customer.date >= start_of_last_month.date(),
+            Customer.date <= last_day_of_last_month.date(),
+        ),
+    }
+    delivered = Customer.status == StatusDescription.Delivered
+
+    columns = []
+    for condition in periods.values():
+        columns += [
+            func.sum(case((condition, 1), else_=0)),
+            func.sum(case((condition, Customer.payments), else_=0.0)),
+            func.sum(case((and_(condition, delivered), 1), else_=0)),
+        ]
+
+    # Both periods are in a single range of dates, so that the stats index only reads
+    # the rows that count, whatever the size of the table:
+    query = select(*columns).where(Customer.date >= start_of_last_month.date())
+    row = session.exec(search_customers(query, search)).one()
+
+    return CustomerStats(
+        **{
+            period: MonthValues(
+                num_customers=row[index * 3] or 0,
+                total_payments=row[index * 3 + 1] or 0.0,
+                num_delivers=row[index * 3 + 2] or 0,
+            )
+            for index, period in enumerate(periods)
+        }
+    )
+
+
+@router.get("/customers/facets", response_model=CustomerFacets, tags=["Customer"])
+def get_customer_facets(
+    response: Response,
+    session: Session = Depends(get_session),
+    customer_filter: CustomerFilter = Depends(),
+    payment_band: float = Query(100.0, gt=0),
+):
+    """
+    Number of customers matching the search and filters, per status, per month and per
+    payment band of width 'payment_band', for filter sidebars and histograms.
+
+    The counts are grouped by status, day and band, and folded into months here.
+    Without a search, each facet is counted from its index: no row is read from the
+    table, and only the bands, not the distinct payments, are returned. The change
+    sequence of the data is sent in the
+    'X-Change-Seq' header.
+    """
+    response.headers["X-Change-Seq"] = str(current_change_seq(session))
+
+    def count_by(*columns):
+        query = select(*columns, func.count()).group_by(*columns)
+        return session.exec(apply_customer_filter(query, customer_filter)).all()
+
+    # floor() of the band, as SQLite may be built without its math functions:
+    quotient = Customer.payments / payment_band
+    truncated = cast(quotient, Integer)
+    band = truncated - case((quotient < truncated, 1), else_=0)
+
+    if customer_filter.search:
+        # The search reads every row: group them by all the facets in a single pass.
+        rows = count_by(Customer.status, Customer.date, band)
+    else:
+        rows = [
+            (status, None, None, count) for status, count in count_by(Customer.status)
+        ]
+        rows += [(None, day, None, count) for day, count in count_by(Customer.date)]
+        rows += [(None, None, index, count) for index, count in count_by(band)]
+
+    statuses = {status.value: 0 for status in StatusDescription}
+    months, bands = {}, {}
+    for status, day, band, count in rows:
+        if status is not None:
+            statuses[status.value] += count
+        if day is not None:
+            month = day.strftime("%Y-%m")
+            months[month] = months.get(month, 0) + count
+        if band is not None:
+            bands[band] = bands.get(band, 0) + count
+
+    return CustomerFacets(
+        total=sum(statuses.values()),
+        statuses=[
+            FacetCount(value=value, count=count) for value, count in statuses.items()
+        ],
+        months=[
+            FacetCount(value=value, count=months[value]) for value in sorted(months)
+        ],
+        payment_bands=[
+            PaymentBandCount(
+                min_payment=index * payment_band,
+                max_payment=(index + 1) * payment_band,
+                count=bands[index],
+            )
+            for index in sorted(bands)
+        ],
+    )
+
+
+@router.get("/customers/changes", response_model=CustomerChanges, tags=["Customer"])
+def get_customer_changes(
+    since: int = Query(..., ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    session: Session = Depends(get_session),
+):
+    """
+    Customers changed or deleted after the change sequence 'since'.
+
+    At most 'limit' changed customers are returned. When there are more, 'has_more'
+    is set, and 'seq' is the sequence to fetch the next batch from.
+    """
+    seq = current_change_seq(session)
+
+    changed = session.exec(
+        select(Customer)
+        .where(Customer.seq > since, Customer.seq <= seq)
+        .order_by(Customer.seq)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(changed) > limit
+    if has_more:
+        changed = changed[:limit]
+        seq = changed[-1].seq
+
+    deleted = session.exec(
+        select(CustomerTombstone.id).where(
+            CustomerTombstone.seq > since, CustomerTombstone.seq <= seq
+        )
+    ).all()
+
+    return CustomerChanges(seq=seq, changed=changed, deleted=deleted, has_more=has_more)
+
+
+@router.get("/customers/events", tags=["Customer"])
+async def get_customer_events():
+    """
+    Server-Sent Events stream of the customer changes.
+
+    A 'change' event is sent with the latest change sequence when the stream opens,
+    and whenever customers change. Fetch the changes from '/customers/changes'.
+    """
+
+    async def stream():
+        async with customer_changes.subscribe() as queue:
+            sent_seq = await anyio.to_thread.run_sync(customer_changes.read_seq)
+            yield change_event(sent_seq)
+            while True:
+                try:
+                    seq = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                # Send only the latest of the pending sequences:
+                while not queue.empty():
+                    seq = max(seq, queue.get_nowait())
+                if seq > sent_seq:
+                    sent_seq = seq
+                    yield change_event(seq)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/customers/{customer_id}", response_model=Customer, tags=["Customer"])
-def get_customer(customer_id: int, session: Session = Depends(get_session)):
+def get_customer(
+    customer_id: int, response: Response, session: Session = Depends(get_session)
+):
     customer = session.get(Customer, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
+    response.headers["ETag"] = customer_etag(customer)
     return customer
 
 
-@router.post("/customers", response_model=List[Customer], tags=["Customer"])
-def add_customers(customers: List[Customer], session: Session = Depends(get_session)):
-    # First, verify that none of the customer IDs already exist.
-    for customer in customers:
-        if session.get(Customer, customer.id):
-            raise HTTPException(
-                status_code=400, detail=f"Customer ID {customer.id} already exists"
-            )
+@router.post(
+    "/customers",
+    response_model=List[Customer],
+    tags=["Customer"],
+    # The body is validated by parse_customer, but documented as customers:
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/Customer"},
+                    }
+                }
+            }
+        }
+    },
+)
+def add_customers(
+    customers: List[Any] = Body(...),
+    session: Session = Depends(get_session),
+):
+    # Table models are not validated by FastAPI: each customer is validated here once.
+    customers = [parse_customer(data, index) for index, data in enumerate(customers)]
 
-    # Add all customers to the session
-    for customer in customers:
-        session.add(customer)
+    def write(session: Session) -> List[Customer]:
+        # First, verify that none of the customer IDs already exist.
+        for customer in customers:
+            if session.get(Customer, customer.id):
+                raise HTTPException(
+                    status_code=400, detail=f"Customer ID {customer.id} already exists"
+                )
 
-    # Commit once after adding all customers
-    session.commit()
+        # Add all customers to the session, each with its own change sequence
+        last_seq = next_change_seq(session, len(customers))
+        for seq, customer in enumerate(customers, start=last_seq - len(customers) + 1):
+            customer.seq = seq
+            customer.version = 1
+            customer.content_hash = content_hash(customer)
+            session.add(customer)
 
-    # Refresh each customer instance so that we have the latest DB state
-    for customer in customers:
-        session.refresh(customer)
+        # Re-used ids are no longer deleted:
+        session.flush()
+        remove_tombstones(session, [customer.id for customer in customers])
 
+        # The inserted values are the state of the database: keep them after the commit
+        for customer in customers:
+            session.expunge(customer)
+        return customers
+
+    # Commit once after adding all customers
+    customers = run_write(session, write)
+    customer_changes.publish(max(customer.seq for customer in customers))
     return customers
 
 
+@router.post(
+    "/customers/upsert",
+    response_model=CustomerUpsertResult,
+    tags=["Customer"],
+    # The body is read from the request, as it may be streamed:
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "description": "A JSON array of customers, or one customer per line.",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/Customer"},
+                    }
+                },
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/Customer"}
+                },
+            },
+        }
+    },
+)
+async def upsert_customers(
+    request: Request,
+    skip_unchanged: bool = True,
+    session: Session = Depends(get_session),
+):
+    """
+    Insert or update customers by id, for sync jobs.
+
+    The body is a JSON array of customers, or newline-delimited JSON (one customer per
+    line) with the 'application/x-ndjson' content type, which is streamed. Customers are
+    upserted in chunks, each committed on its own: the upsert is idempotent, so a failed
+    sync is simply sent again.
+
+    With 'skip_unchanged', customers with the same values as their last upsert are not
+    written again.
+    """
+    result = CustomerUpsertResult()
+    received = 0
+    async for chunk in read_customer_chunks(request, UPSERT_CHUNK_SIZE):
+        inserted, updated, seq = await anyio.to_thread.run_sync(
+            run_write,
+            session,
+            lambda session: upsert_customer_rows(session, chunk, skip_unchanged),
+        )
+        if inserted or updated:
+            customer_changes.publish(seq)
+            result.seq = seq
+        result.inserted += inserted
+        result.updated += updated
+        received += len(chunk)
+
+    result.unchanged = received - result.inserted - result.updated
+    if not result.seq:
+        result.seq = await anyio.to_thread.run_sync(current_change_seq, session)
+    return result
+
+
+@router.patch("/customers", response_model=CustomerBulkResult, tags=["Customer"])
+def update_customers(
+    bulk_update: CustomerBulkUpdate, session: Session = Depends(get_session)
+):
+    """
+    Update many customers in one transaction.
+
+    Either 'customers' lists partial updates by id, or 'filter' selects the customers
+    (by search string, status, and ranges of dates and payments) to which 'patch' is
+    applied. Customers getting the same values are updated by a single statement.
+
+    Updates setting no field are rejected, as they would still count as changes.
+    """
+    if bulk_update.customers is not None:
+        if bulk_update.filter is not None or bulk_update.patch is not None:
+            raise HTTPException(400, "Send either customers, or a filter and a patch")
+
+        empty = [patch.id for patch in bulk_update.customers if not patch_values(patch)]
+        if empty:
+            raise HTTPException(400, f"The updates of customers {empty} set no field")
+
+        # The last update of a customer wins:
+        updates = {
+            patch.id: tuple(sorted(patch_values(patch).items()))
+            for patch in bulk_update.customers
+        }
+        groups = {}
+        for customer_id, values in updates.items():
+            groups.setdefault(values, []).append(customer_id)
+        selections = [
+            (lambda query, ids=ids: query.where(Customer.id.in_(ids)), dict(values))
+            for values, ids in groups.items()
+        ]
+    elif bulk_update.filter is not None and bulk_update.patch is not None:
+        values = patch_values(bulk_update.patch)
+        if not values:
+            raise HTTPException(400, "The patch sets no field")
+
+        customer_filter = bulk_update.filter
+        selections = [(lambda query: filter_customers(query, customer_filter), values)]
+    else:
+        raise HTTPException(400, "Send either customers, or a filter and a patch")
+
+    def write(session: Session) -> tuple:
+        # Takes the write lock: the sequence can't change until the commit.
+        seq = next_change_seq(session, 0)
+        updated = []
+        for selection, values in selections:
+            updated += update_customer_rows(
+                session, selection, values, seq + len(updated)
+            )
+        if updated:
+            seq = next_change_seq(session, len(updated))
+        return updated, seq
+
+    updated, seq = run_write(session, write)
+    if updated:
+        customer_changes.publish(seq)
+
+    not_found = []
+    if bulk_update.customers is not None:
+        not_found = sorted(set(updates) - set(updated))
+    return CustomerBulkResult(affected=len(updated), not_found=not_found, seq=seq)
+
+
+@router.delete("/customers", response_model=CustomerBulkResult, tags=["Customer"])
+def delete_customers(
+    bulk_delete: CustomerBulkDelete, session: Session = Depends(get_session)
+):
+    """
+    Delete many customers in one statement: either the customers of 'ids', or the
+    customers selected by 'filter' (by search string and status).
+    """
+    query = delete(Customer)
+    if bulk_delete.ids is not None and bulk_delete.filter is None:
+        query = query.where(Customer.id.in_(bulk_delete.ids))
+    elif bulk_delete.filter is not None and bulk_delete.ids is None:
+        query = filter_customers(query, bulk_delete.filter)
+    else:
+        raise HTTPException(400, "Send either ids or a filter")
+
+    def write(session: Session) -> tuple:
+        deleted = session.scalars(query.returning(Customer.id)).all()
+        seq = next_change_seq(session, len(deleted))
+        add_tombstones(session, deleted, seq - len(deleted) + 1)
+        return deleted, seq
+
+    deleted, seq = run_write(session, write)
+    if deleted:
+        customer_changes.publish(seq)
+
+    not_found = []
+    if bulk_delete.ids is not None:
+        not_found = sorted(set(bulk_delete.ids) - set(deleted))
+    return CustomerBulkResult(affected=len(deleted), not_found=not_found, seq=seq)
+
+
 @router.delete("/customers/{customer_id}", response_model=dict, tags=["Customer"])
 def delete_customer(customer_id: int, session: Session = Depends(get_session)):
-    customer = session.get(Customer, customer_id)
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    session.delete(customer)
-    session.commit()
-    return {"message": "Customer deleted successfully"}
+    def write(session: Session) -> int:
+        # A single DELETE ... RETURNING, instead of a SELECT then a DELETE:
+        deleted_id = session.scalars(
+            delete(Customer).where(Customer.id == customer_id).returning(Customer.id)
+        ).one_or_none()
+        if deleted_id is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        seq = next_change_seq(session)
+        add_tombstone(session, customer_id, seq)
+        return seq
+
+    seq = run_write(session, write)
+    customer_changes.publish(seq)
+    return {"message": "Customer deleted successfully", "seq": seq}
 
 
 @router.put("/customers/{customer_id}", response_model=Customer, tags=["Customer"])
 def update_customer(
     customer_id: int,
     customer_update: CustomerUpdate,
+    response: Response,
     session: Session = Depends(get_session),
+    if_match: Optional[str] = Header(None),
 ):
-    customer = session.get(Customer, customer_id)
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
+    """
+    Update a customer.
 
+    With an 'If-Match' header, the customer is only updated if it is still at the
+    version of one of its entity tags (the 'ETag' header of the customer responses),
+    and 412 is returned otherwise. Concurrent edits are then detected without a lock.
+    """
     update_data = customer_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(customer, key, value)
+    versions = parse_if_match(if_match)
+
+    def write(session: Session) -> Customer:
+        # A single conditional UPDATE ... RETURNING, instead of a SELECT, an UPDATE and
+        # a refresh. An unknown id or another version updates no row (and the sequence
+        # allocation is rolled back with the error):
+        query = update(Customer).where(Customer.id == customer_id)
+        if versions is not None:
+            query = query.where(Customer.version.in_(versions))
+        customer = session.scalars(
+            query.values(
+                **update_data,
+                seq=next_change_seq(session),
+                version=Customer.version + 1,
+                content_hash=None,
+            ).returning(Customer)
+        ).one_or_none()
+        if customer is None:
+            current = None
+            if versions is not None:
+                current = session.get(Customer, customer_id)
+            if current is not None:
+                raise HTTPException(
+                    status_code=412,
+                    detail="Customer was modified by another update",
+                    headers={
+                        "ETag": customer_etag(current),
+                        "X-Change-Seq": str(current.seq),
+                    },
+                )
+            raise HTTPException(status_code=404, detail="Customer not found")
+
+        # Keep the returned values, which the commit would expire and reload:
+        session.expunge(customer)
+        return customer
 
-    session.add(customer)
-    session.commit()
-    session.refresh(customer)
+    customer = run_write(session, write)
+    customer_changes.publish(customer.seq)
+    response.headers["ETag"] = customer_etag(customer)
     return customer
@@ -0,0 +1,97 @@
+"""
+Idempotent upsert of customers, for the sync jobs of external systems.
+
+The customers are inserted or updated by id with SQLite's 'INSERT ... ON CONFLICT(id)
+DO UPDATE', one statement per chunk. Each upserted row keeps a hash of its values, so
+that a resync can skip the rows that did not change: they are not written, and get no
+new change sequence. The other writes clear the hash, so that the next sync always
+restores the rows changed in between.
+"""
+
+import hashlib
+import json
+import os
+from typing import List
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session
+
+from app.backend.customer.changes import next_change_seq, remove_tombstones
+from app.backend.customer.models import Customer
+
+# Customers upserted per statement (and per transaction). SQLite allows 32766
+# parameters per statement, and a customer takes 11:
+UPSERT_CHUNK_SIZE = int(os.getenv("CUSTOMER_UPSERT_CHUNK_SIZE", "500"))
+
+# Values of a customer, as opposed to the fields maintained by the API:
+CONTENT_FIELDS = ("name", "email", "phone", "address", "date", "payments", "status")
+
+
+def content_hash(customer: Customer) -> str:
+    """Hash the values of a customer."""
+    values = json.dumps(
+        [getattr(customer, field) for field in CONTENT_FIELDS], default=str
+    )
+    return hashlib.blake2b(values.encode(), digest_size=16).hexdigest()
+
+
+def upsert_customer_rows(
+    session: Session, customers: List[Customer], skip_unchanged: bool = True
+) -> tuple:
+    """
+    Insert or update customers by id, in a single statement.
+
+    Args:
+        session (Session): The session of the write.
+        customers (List[Customer]): The customers, with distinct ids.
+        skip_unchanged (bool): Don't write the customers whose values have the hash of
+            their last upsert.
+
+    Returns:
+        tuple: The number of inserted and of updated customers, and the change sequence
+            of the last one.
+    """
+    # Takes the write lock: the sequence can't change until the commit.
+    base_seq = next_change_seq(session, 0)
+
+    query = insert(Customer).values(
+        [
+            {
+                **{field: getattr(customer, field) for field in CONTENT_FIELDS},
+                "id": customer.id,
+                "seq": seq,
+                "version": 1,
+                "content_hash": content_hash(customer),
+            }
+            for seq, customer in enumerate(customers, start=base_seq + 1)
+        ]
+    )
+    query = query.on_conflict_do_update(
+        index_elements=["id"],
+        set_={
+            **{
+                field: query.excluded[field]
+                for field in (*CONTENT_FIELDS, "seq", "content_hash")
+            },
+            "version": Customer.version + 1,
+        },
+        where=(
+            Customer.content_hash.is_distinct_from(query.excluded.content_hash)
+            if skip_unchanged
+            else None
+        ),
+    )
+    # Skipped rows are not returned. Inserted rows are at their first version:
+    written = session.execute(
+        query.returning(Customer.id, Customer.version, Customer.seq)
+    ).all()
+
+    inserted = [row.id for row in written if row.version == 1]
+    # Re-used ids are no longer deleted:
+    remove_tombstones(session, inserted)
+
+    # Allocate the sequence values up to the last written row. Skipped rows leave gaps:
+    last_seq = max((row.seq for row in written), default=base_seq)
+    if last_seq > base_seq:
+        next_change_seq(session, last_seq - base_seq)
+    return len(inserted), len(written) - len(inserted), last_seq
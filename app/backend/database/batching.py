@@ -0,0 +1,199 @@
+"""
+Group commit of the small concurrent writes.
+
+SQLite has a single writer: every write transaction takes the lock of the database
+file and ends with its own commit (and fsync). Under load, many single-row writes
+then mostly wait for each other.
+
+When enabled, the writes are queued to a single writer thread instead. It collects
+the writes arriving within a short window, and applies them in one transaction, each
+in its own savepoint: a failing write is rolled back alone, and its caller gets its
+error, while the others are committed together, with a single fsync.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.backend.database.utils import get_engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Queue the writes to the writer thread, instead of committing each one on its own:
+WRITE_BATCHING = os.getenv("WRITE_BATCHING", "false").lower() in ("1", "true", "yes")
+
+# Time the writer waits for more writes after the first one of a batch, in seconds:
+WRITE_BATCH_WINDOW = float(os.getenv("WRITE_BATCH_WINDOW", "0.002"))
+
+# Maximum number of writes committed in one transaction:
+WRITE_BATCH_MAX_SIZE = int(os.getenv("WRITE_BATCH_MAX_SIZE", "100"))
+
+
+def get_batch_engine():
+    """
+    Create the engine of the writer thread.
+
+    pysqlite manages transactions itself, which breaks SAVEPOINT. As recommended by
+    SQLAlchemy, its handling is disabled and the transactions are started explicitly.
+    'BEGIN IMMEDIATE' takes the write lock at once, instead of at the first write.
+    """
+    engine = get_engine()
+    engine.echo = False
+
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+class WriteBatcher:
+    """
+    Writer thread applying the queued writes in batches, one transaction per batch.
+
+    Args:
+        window (float): Seconds to wait for more writes after the first one of a batch.
+        max_size (int): The maximum number of writes of a batch.
+    """
+
+    def __init__(self, window: float, max_size: int):
+        self.window = window
+        self.max_size = max_size
+
+        self.batches = 0
+        self.writes = 0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._engine = None
+
+    def submit(self, operation: Callable[[Session], T]) -> T:
+        """
+        Apply a write in the next batch, and wait for its commit.
+
+        Args:
+            operation (Callable): The write, called with the session of the batch. It
+                must not commit, and its result must not need the session afterwards.
+
+        Returns:
+            The result of the operation, once committed.
+
+        Raises:
+            Exception: The error of the operation, or of the commit of its batch.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="write-batcher", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((operation, future))
+        return future.result()
+
+    def stop(self):
+        """Apply the queued writes, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._apply(batch)
+            if stopping:
+                return
+
+    def _apply(self, batch: list):
+        """Apply a batch of writes in one transaction, each in its own savepoint."""
+        if self._engine is None:
+            self._engine = get_batch_engine()
+
+        results = []
+        try:
+            # The results are used by the callers after the commit, from their threads:
+            with Session(self._engine, expire_on_commit=False) as session:
+                for operation, future in batch:
+                    try:
+                        with session.begin_nested():
+                            result = operation(session)
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        results.append((future, result))
+                session.commit()
+        except Exception as e:
+            logger.exception("Error committing a batch of writes")
+            for future, _ in results:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result in results:
+            future.set_result(result)
+
+
+write_batcher = WriteBatcher(window=WRITE_BATCH_WINDOW, max_size=WRITE_BATCH_MAX_SIZE)
+
+
+def run_write(session: Session, operation: Callable[[Session], T]) -> T:
+    """
+    Apply a write and commit it, in a batch of the writer thread if batching is on.
+
+    Args:
+        session (Session): The session of the request, used when batching is off.
+        operation (Callable): The write, called with the session to use. It must not
+            commit.
+
+    Returns:
+        The result of the operation, once committed.
+    """
+    if WRITE_BATCHING:
+        return write_batcher.submit(operation)
+
+    try:
+        result = operation(session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return result
+
+
+def stop_write_batcher():
+    """Commit the queued writes and stop the writer thread of this worker."""
+    write_batcher.stop()
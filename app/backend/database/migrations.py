@@ -0,0 +1,190 @@
+"""
+Versioned migrations of the database schema, applied at startup.
+
+'create_all' creates the missing tables in their latest form, but leaves the existing
+tables as they are. The changes to existing tables are the numbered migrations below.
+Each one is applied once, in its own transaction, and recorded with the time it took
+in the 'schema_migration' table.
+
+Migrations are only ever appended to MIGRATIONS, and must be idempotent: a database
+may already have some of their changes, from a newer 'create_all' or from a worker
+starting at the same time.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, Index, Integer, func, inspect, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import Field, SQLModel, select
+
+from app.backend.auth.models import User
+from app.backend.customer.models import Customer, CustomerTombstone
+
+logger = logging.getLogger(__name__)
+
+# Time a worker waits for the migrations of another worker, in milliseconds:
+MIGRATION_LOCK_TIMEOUT = 60_000
+
+
+# Migrations applied to the database
+class SchemaMigration(SQLModel, table=True):
+    __tablename__ = "schema_migration"
+
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: str
+    duration_ms: Optional[float] = None
+
+
+def add_column(connection, column: Column):
+    """
+    Add a model column to its existing table, if missing.
+
+    The column needs a server default (or to be nullable), to fill the existing rows.
+    """
+    table = column.table
+    existing = {item["name"] for item in inspect(connection).get_columns(table.name)}
+    if column.name not in existing:
+        column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+        connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+
+
+def create_index(connection, index: Index):
+    """Create a model index, if missing."""
+    index.create(connection, checkfirst=True)
+
+
+def get_index(table, name: str) -> Index:
+    return next(index for index in table.indexes if index.name == name)
+
+
+def add_customer_change_columns(connection):
+    """Add the change sequence, version and content hash columns of the customers."""
+    for name in ("seq", "version", "content_hash"):
+        add_column(connection, Customer.__table__.c[name])
+
+
+def create_customer_stats_index(connection):
+    """Create the covering index of the customer stats."""
+    create_index(connection, get_index(Customer.__table__, "ix_customer_stats"))
+
+
+def create_secondary_indexes(connection):
+    """Index the sorted and filtered customer columns, the changes and the user emails."""
+    duplicates = connection.execute(
+        select(User.email).group_by(User.email).having(func.count() > 1)
+    ).all()
+    if duplicates:
+        emails = ", ".join(row.email for row in duplicates)
+        raise RuntimeError(
+            f"Users share the same email, which must be unique: {emails}. "
+            "Remove the duplicates and restart."
+        )
+
+    for table in (Customer.__table__, CustomerTombstone.__table__, User.__table__):
+        for index in table.indexes:
+            create_index(connection, index)
+
+
+def store_customer_dates_and_statuses_as_codes(connection):
+    """
+    Rebuild the customer table, with its dates as days since 1970-01-01 and its
+    statuses as codes, instead of text.
+
+    SQLite can't change the type of a column: the table is copied into a new one.
+    """
+    columns = {
+        column["name"]: column for column in inspect(connection).get_columns("customer")
+    }
+    if isinstance(columns["date"]["type"], Integer):
+        return
+
+    table = Customer.__table__
+    for index in inspect(connection).get_indexes("customer"):
+        connection.exec_driver_sql(f"DROP INDEX {index['name']}")
+    connection.exec_driver_sql("ALTER TABLE customer RENAME TO customer_old")
+    table.create(connection)
+
+    status_codes = " ".join(
+        f"WHEN '{status}' THEN {code}"
+        for status, code in table.c.status.type.codes().items()
+    )
+    values = {
+        "date": "CAST(julianday(date) - julianday('1970-01-01') AS INTEGER)",
+        "status": f"CASE status {status_codes} END",
+    }
+    names = [column.name for column in table.columns]
+    connection.exec_driver_sql(
+        f"INSERT INTO customer ({', '.join(names)}) "
+        f"SELECT {', '.join(values.get(name, name) for name in names)} "
+        "FROM customer_old"
+    )
+    connection.exec_driver_sql("DROP TABLE customer_old")
+
+
+MIGRATIONS = [
+    add_customer_change_columns,
+    create_customer_stats_index,
+    create_secondary_indexes,
+    store_customer_dates_and_statuses_as_codes,
+]
+
+
+def record_migration(connection, version: int, migration) -> bool:
+    """Record a migration as applied, unless it already is. Returns True if recorded."""
+    return bool(
+        connection.execute(
+            insert(SchemaMigration)
+            .values(
+                version=version,
+                name=migration.__name__,
+                applied_at=datetime.now().isoformat(timespec="seconds"),
+            )
+            .on_conflict_do_nothing()
+        ).rowcount
+    )
+
+
+def run_migrations(engine):
+    """
+    Create the missing tables, then apply the pending migrations, logging their time.
+
+    The tables of a new database are created in their latest form: the migrations are
+    then only recorded.
+    """
+    with engine.connect() as connection:
+        # The workers starting together wait for each other, instead of failing:
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT}")
+        connection.commit()
+
+        with connection.begin():
+            # Take the write lock, so that the tables are created by a single worker:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            new_database = not inspect(connection).get_table_names()
+            SQLModel.metadata.create_all(connection)
+            if new_database:
+                for version, migration in enumerate(MIGRATIONS, start=1):
+                    record_migration(connection, version, migration)
+
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            with connection.begin():
+                # Recording the migration first takes the write lock, so that only one
+                # worker applies it:
+                if not record_migration(connection, version, migration):
+                    continue
+
+                start = time.perf_counter()
+                migration(connection)
+                duration_ms = round((time.perf_counter() - start) * 1000, 1)
+                connection.execute(
+                    update(SchemaMigration)
+                    .where(SchemaMigration.version == version)
+                    .values(duration_ms=duration_ms)
+                )
+            logger.info(
+                f"Applied migration {version} ({migration.__name__}) in {duration_ms} ms"
+            )
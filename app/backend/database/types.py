@@ -0,0 +1,65 @@
+"""
+Compact column types, stored as integers but used as dates and enums.
+
+SQLite has no date or enum types: the values are otherwise stored as text, which takes
+more space in the table and its indexes, and is slower to compare.
+"""
+
+from datetime import date, timedelta
+from enum import Enum
+from typing import Optional, Type
+
+from sqlalchemy import Integer, SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+EPOCH = date(1970, 1, 1)
+
+
+class EpochDays(TypeDecorator):
+    """A date, stored as its number of days since 1970-01-01."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        return (value - EPOCH).days
+
+    def process_result_value(self, value, dialect) -> Optional[date]:
+        if value is None:
+            return None
+        return EPOCH + timedelta(days=value)
+
+
+class EnumCode(TypeDecorator):
+    """
+    An enum, stored as the position of its member in the enum class.
+
+    Members may be added at the end of the class, but never removed or reordered, as
+    that changes the stored codes.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class: Type[Enum]):
+        super().__init__()
+        self.enum_class = enum_class
+        self._members = list(enum_class)
+
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return self._members.index(self.enum_class(value))
+
+    def process_result_value(self, value, dialect) -> Optional[Enum]:
+        if value is None:
+            return None
+        return self._members[value]
+
+    def codes(self) -> dict:
+        """Return the code of each value of the enum."""
+        return {member.value: code for code, member in enumerate(self._members)}
@@ -5,14 +5,18 @@ Module for creating and managing the database connection.
 from pathlib import Path
 
 from sqlalchemy import exc
-from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel import Session, create_engine
+
+from app.backend.database.migrations import run_migrations
 
 
 def get_engine():
     """Create and return the database engine."""
 
     echo = True
-    database_path = Path("app/backend/database/data/database.db")
+    # Resolved from this file, so the app also works outside of the project root
+    # (e.g. when the Reflex backend calls it in-process).
+    database_path = Path(__file__).parent / "data" / "database.db"
 
     database_url = f"sqlite:///{database_path}"
 
@@ -29,10 +33,10 @@ def get_engine():
 
 
 def initialize_database():
-    """Create the database tables if they don't exist."""
+    """Create the database tables if they don't exist, and migrate the existing ones."""
     engine = get_engine()
     try:
-        SQLModel.metadata.create_all(engine)
+        run_migrations(engine)
 
     except exc.SQLAlchemyError as e:
         print(f"An error occurred while creating the database tables: {e}")
@@ -1,18 +1,29 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from pathlib import Path
+
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.openapi.utils import get_openapi
-from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from starlette.exceptions import HTTPException as StarletteHTTPException
+from fastapi.responses import RedirectResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.gzip import GZipMiddleware
 
+from app.backend.api.responses import APIResponse
 from app.backend.api.routes.api import router as api_router
 from app.backend.auth.auth import get_current_app_user
 from app.backend.auth.models import User
+from app.backend.database.batching import stop_write_batcher
 from app.backend.database.utils import initialize_database
+from app.backend.middleware.compression import CompressionMiddleware
+from app.backend.middleware.content_negotiation import ContentNegotiationMiddleware
 from app.backend.middleware.log_middleware import log_and_track_request_process_time
 from app.backend.middleware.security_headers import add_security_headers
+from app.backend.monitoring.loop_lag import (
+    start_loop_lag_monitor,
+    stop_loop_lag_monitor,
+)
+from app.backend.static_files.spa import SPAStaticFiles
+from app.backend.swagger.openapi import etag_matches, openapi_schema_cache
+
+# Directory of the exported Reflex frontend, resolved from this file:
+STATIC_DIRECTORY = Path(__file__).parents[1] / "frontend/customer_app/.web/_static"
 
 origins = [
     "http://localhost",
@@ -26,9 +37,14 @@ FastAPI + Reflex Application
 """
 
 # Create a FastAPI application instance.
-# The 'on_startup' parameter ensures that 'initialize_database' is called when the app starts.
+# The 'on_startup' parameter ensures that 'initialize_database' is called when the app starts,
+# and that the event loop lag monitor runs for the lifetime of each worker.
+# The writes still queued for the write batcher are committed at shutdown.
+# Responses are encoded as JSON with orjson, or as MessagePack when the client asks.
 app = FastAPI(
-    on_startup=[initialize_database],
+    default_response_class=APIResponse,
+    on_startup=[initialize_database, start_loop_lag_monitor],
+    on_shutdown=[stop_loop_lag_monitor, stop_write_batcher],
     redoc_url=None,
     openapi_url=None,
     docs_url=None,
@@ -44,17 +60,22 @@ app.include_router(api_router)
 
 
 @app.get("/openapi.json", include_in_schema=False)
-async def custom_openapi_json(current_user: User = Depends(get_current_app_user)):
+async def custom_openapi_json(
+    request: Request, current_user: User = Depends(get_current_app_user)
+):
     """
     Blocks access to the OpenAPI JSON endpoint for authenticated users by redirecting them to the sign-in page.
 
     Args:
+        request (Request): The incoming request, used for the If-None-Match header.
         current_user (User, optional): The current authenticated user. Defaults to Depends(get_current_app_user).
 
     Returns:
         RedirectResponse: Redirects authenticated users to the sign-in page. Returns the OpenAPI JSON data for
         non-authenticated users.
 
+    The schema is built once and served as cached bytes with an ETag. It is only rebuilt when the routes change.
+
     Note:
         This function prevents authenticated users from accessing the OpenAPI JSON endpoint, enhancing security
         by restricting access to API documentation for unauthorized users.
@@ -66,27 +87,13 @@ async def custom_openapi_json(current_user: User = Depends(get_current_app_user)
         )
         return response
 
-    return get_openapi(
-        title=app.title,
-        version=app.version,
-        description=app.description,
-        routes=app.routes,
-    )
-
-
-# Define a subclass of StaticFiles to create a custom static file handler
-# that supports client-side routing in Single Page Applications (SPAs).
-class SPAStaticFiles(StaticFiles):
-    # Override the get_response method, which is responsible for retrieving
-    # static file responses for given paths.
-    async def get_response(self, path: str, scope):
-        try:
-            return await super().get_response(path, scope)
-        except (HTTPException, StarletteHTTPException) as ex:
-            if ex.status_code == 404:
-                return await super().get_response("index.html", scope)
-            else:
-                raise ex
+    body, etag = openapi_schema_cache.get(app)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 # Mount the SPAStaticFiles instance at the root URL ("/").
@@ -96,7 +103,7 @@ class SPAStaticFiles(StaticFiles):
 # - 'name' is an identifier for this mounted application
 app.mount(
     "/",
-    SPAStaticFiles(directory="app/frontend/customer_app/.web/_static/", html=True),
+    SPAStaticFiles(directory=STATIC_DIRECTORY, html=True),
     name="_next",
 )
 
@@ -107,6 +114,9 @@ app.add_middleware(BaseHTTPMiddleware, dispatch=add_security_headers)
 # Add middleware to the application to add process time header to responses:
 app.add_middleware(BaseHTTPMiddleware, dispatch=log_and_track_request_process_time)
 
+# Add middleware negotiating the media type of the responses (JSON or MessagePack):
+app.add_middleware(ContentNegotiationMiddleware)
+
 # CORS (Cross-Origin Resource Sharing)
 app.add_middleware(
     CORSMiddleware,
@@ -117,5 +127,5 @@ app.add_middleware(
 )
 
 
-# Add GZipMiddleware as the last middleware
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Add CompressionMiddleware (brotli, zstd or gzip) as the last middleware
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
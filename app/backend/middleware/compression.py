@@ -0,0 +1,309 @@
+"""
+Response compression middleware negotiating brotli, zstd or gzip.
+
+Replaces Starlette's GZipMiddleware:
+
+1. The encoding is negotiated from the Accept-Encoding header (br, zstd, then gzip).
+2. The compression level depends on the content type of the response.
+3. Responses that are small, already encoded or of an incompressible type are left as is.
+4. Bodies are compressed chunk by chunk, so streaming responses keep streaming.
+
+Brotli and zstd are optional: without the 'brotli' or 'zstandard' packages,
+only gzip is offered.
+"""
+
+import zlib
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional.
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional.
+    zstandard = None
+
+# Encodings in order of server preference, when the client has no preference:
+AVAILABLE_ENCODINGS = tuple(
+    encoding
+    for encoding, available in (
+        ("br", brotli is not None),
+        ("zstd", zstandard is not None),
+        ("gzip", True),
+    )
+    if available
+)
+
+# Levels tuned for on-the-fly compression: high enough to pay off, cheap enough
+# to not dominate request CPU time.
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
+CONTENT_TYPE_LEVELS = {
+    # Large, repetitive API payloads compress well at low levels:
+    "application/json": {"br": 4, "zstd": 3, "gzip": 5},
+    "text/html": {"br": 5, "zstd": 6, "gzip": 6},
+    "text/css": {"br": 5, "zstd": 6, "gzip": 6},
+    "text/javascript": {"br": 5, "zstd": 6, "gzip": 6},
+    "application/javascript": {"br": 5, "zstd": 6, "gzip": 6},
+}
+
+# Content types that are already compressed, or must not be buffered:
+INCOMPRESSIBLE_CONTENT_TYPES = (
+    "application/gzip",
+    "application/octet-stream",
+    "application/pdf",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "text/event-stream",
+    "video/*",
+)
+
+# Chunks larger than this are compressed in a worker thread, off the event loop:
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def parse_accept_encoding(accept_encoding: str) -> dict:
+    """
+    Parse an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): The raw header value, e.g. "gzip, deflate, br;q=0.9".
+
+    Returns:
+        dict: The quality of each lower-cased encoding.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Return the best available encoding accepted by the client, if any."""
+    qualities = parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+
+    best, best_quality = None, 0.0
+    for encoding in AVAILABLE_ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        # Ties go to the encoding listed first in AVAILABLE_ENCODINGS:
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encoding_etag(etag: str, encoding: str) -> str:
+    """
+    Return the ETag of a representation compressed with 'encoding'.
+
+    Each representation needs its own strong validator: the encoding is appended to the
+    tag, as for the precompressed static files.
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _is_incompressible(content_type: str) -> bool:
+    media_types = {content_type, content_type.partition("/")[0] + "/*"}
+    return not media_types.isdisjoint(INCOMPRESSIBLE_CONTENT_TYPES)
+
+
+class _Compressor:
+    """Incremental compressor with the same interface for every encoding."""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the best encoding the client accepts.
+
+    Args:
+        app (ASGIApp): The application to wrap.
+        minimum_size (int): Responses smaller than this, in bytes, are not compressed.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.level = DEFAULT_LEVELS[encoding]
+        self.compressor: _Compressor = None
+        # Tags of the uncompressed responses, the client has compressed here before:
+        self.identity_tags: set = set()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        scope = self.add_identity_tags(scope)
+        await self.app(scope, receive, self.send_with_compression)
+
+    def add_identity_tags(self, scope: Scope) -> Scope:
+        """
+        Add the tags of the uncompressed responses to the If-None-Match header, for the
+        tags of responses compressed here, which the application doesn't know.
+        """
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match:
+            return scope
+
+        suffix = f'-{self.encoding}"'
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.endswith(suffix):
+                self.identity_tags.add(tag[: -len(suffix)] + '"')
+        if not self.identity_tags:
+            return scope
+
+        scope = {**scope, "headers": list(scope["headers"])}
+        MutableHeaders(scope=scope)["if-none-match"] = ", ".join(
+            [if_none_match, *self.identity_tags]
+        )
+        return scope
+
+    async def send_with_compression(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the start message until we know whether the body gets compressed.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or _is_incompressible(content_type)
+            )
+            etag = headers.get("etag")
+            if message["status"] == 304 and etag in self.identity_tags:
+                # Not modified since the client got it compressed here:
+                MutableHeaders(raw=message["headers"])["ETag"] = encoding_etag(
+                    etag, self.encoding
+                )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                levels = CONTENT_TYPE_LEVELS.get(content_type, DEFAULT_LEVELS)
+                self.level = levels[self.encoding]
+
+        elif message_type == "http.response.early_hint" or self.passthrough:
+            await self.send(message)
+
+        elif message_type != "http.response.body":
+            # e.g. 'http.response.pathsend': there is no body to compress.
+            if not self.started:
+                self.passthrough = True
+                await self.send(self.initial_message)
+            await self.send(message)
+
+        elif not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+
+            if len(body) < self.minimum_size and not more_body:
+                # Don't compress small responses.
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.level)
+            body = await self._compress(body, finish=not more_body)
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = encoding_etag(headers["etag"], self.encoding)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+
+            message["body"] = body
+            await self.send(self.initial_message)
+            await self.send(message)
+
+        else:
+            # Remaining body of a streaming response.
+            more_body = message.get("more_body", False)
+            message["body"] = await self._compress(
+                message.get("body", b""), finish=not more_body
+            )
+            await self.send(message)
+
+    async def _compress(self, body: bytes, finish: bool) -> bytes:
+        def compress():
+            data = self.compressor.compress(body) if body else b""
+            return data + self.compressor.finish() if finish else data
+
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(compress)
+        return compress()
@@ -0,0 +1,53 @@
+"""
+Negotiation of the media type of the API responses, from the Accept header.
+
+The negotiated type is set in 'response_media_type' for the whole request, and used
+by APIResponse when the response is rendered.
+"""
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.backend.api.responses import (
+    AVAILABLE_MEDIA_TYPES,
+    JSON_MEDIA_TYPE,
+    response_media_type,
+)
+from app.backend.middleware.compression import parse_accept_encoding
+
+
+def negotiate_media_type(accept: str) -> str:
+    """Return the available media type preferred by the client, JSON by default."""
+    # Same syntax as Accept-Encoding: comma-separated values with quality parameters.
+    qualities = parse_accept_encoding(accept)
+    if not qualities:
+        return JSON_MEDIA_TYPE
+
+    any_type = qualities.get("*/*", 0.0)
+    best, best_quality = JSON_MEDIA_TYPE, 0.0
+    for media_type in AVAILABLE_MEDIA_TYPES:
+        wildcard = qualities.get(media_type.partition("/")[0] + "/*", any_type)
+        quality = qualities.get(media_type, wildcard)
+        # Ties go to the media type listed first in AVAILABLE_MEDIA_TYPES:
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+class ContentNegotiationMiddleware:
+    """Set the media type of the responses of each request, from its Accept header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        media_type = negotiate_media_type(Headers(scope=scope).get("accept", ""))
+        token = response_media_type.set(media_type)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_media_type.reset(token)
@@ -0,0 +1,168 @@
+"""
+Module for monitoring the lag of the asyncio event loop.
+
+A probe coroutine sleeps for a fixed interval and measures how late it wakes up.
+The delay is the time the loop spent running other callbacks, so any blocking call
+made from an 'async def' handler (database access, bcrypt, ...) shows up as lag.
+
+In debug mode, a watchdog thread also samples the stack of the event loop thread
+whenever the loop has been held longer than the threshold, and logs it.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Interval between two probes, in seconds:
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+
+# A probe that wakes up later than this (in seconds) is counted as a stall:
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.1"))
+
+# Log the stack of whatever is blocking the loop (debug only, it uses a thread):
+LOOP_LAG_DEBUG = os.getenv("LOOP_LAG_DEBUG", "false").lower() in ("1", "true", "yes")
+
+
+class LoopLagMonitor:
+    """
+    Background watchdog measuring the lag of the running event loop.
+
+    Args:
+        interval (float): Seconds between two probes.
+        threshold (float): Lag, in seconds, above which a probe counts as a stall.
+        debug (bool): Start a watchdog thread that logs the stack of the blocking code.
+    """
+
+    def __init__(self, interval: float, threshold: float, debug: bool = False):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+
+        self.samples = 0
+        self.stalls = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start probing the running loop. Must be called from the loop thread."""
+        if self._task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._probe(), name="loop-lag-monitor")
+
+        if self.debug:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-lag-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self):
+        """Stop the probe and the watchdog thread."""
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval + self.threshold)
+            self._watchdog = None
+
+    async def _probe(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self._record(max(0.0, now - start - self.interval))
+
+    def _record(self, lag: float):
+        self.samples += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+        # Exponentially weighted moving average, so the metric follows recent load:
+        self.avg_lag = lag if self.samples == 1 else 0.9 * self.avg_lag + 0.1 * lag
+
+        if lag > self.threshold:
+            self.stalls += 1
+            logger.warning(f"Event loop lag of {lag * 1000:.1f} ms detected.")
+
+    def _watch(self):
+        """Watchdog thread: log the loop thread stack while the loop is blocked."""
+        reported_heartbeat = None
+        poll_interval = self.threshold / 2
+
+        while not self._stopped.wait(poll_interval):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+
+            # Only report each stall once, while it is happening:
+            if blocked_for <= self.threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            task = asyncio.current_task(self._loop)
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                f"Event loop blocked for more than {blocked_for * 1000:.1f} ms "
+                f"by {task!r}. Stack of the event loop thread:\n{stack}"
+            )
+
+    def metrics(self) -> dict:
+        """Return the current lag measurements, in milliseconds."""
+        return {
+            "interval_ms": round(self.interval * 1000, 3),
+            "threshold_ms": round(self.threshold * 1000, 3),
+            "samples": self.samples,
+            "stalls": self.stalls,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "avg_lag_ms": round(self.avg_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "running": self._task is not None,
+        }
+
+
+# One monitor per worker process:
+loop_lag_monitor = LoopLagMonitor(
+    interval=LOOP_LAG_INTERVAL,
+    threshold=LOOP_LAG_THRESHOLD,
+    debug=LOOP_LAG_DEBUG,
+)
+
+
+async def start_loop_lag_monitor():
+    """Start the event loop lag monitor of this worker."""
+    loop_lag_monitor.start()
+
+
+async def stop_loop_lag_monitor():
+    """Stop the event loop lag monitor of this worker."""
+    await loop_lag_monitor.stop()
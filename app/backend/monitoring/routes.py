@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+from app.backend.monitoring.loop_lag import loop_lag_monitor
+
+router = APIRouter(prefix="/api")
+
+
+@router.get("/metrics/event-loop", response_model=dict, tags=["Monitoring"])
+async def get_event_loop_metrics():
+    """
+    Return the event loop lag measured by the background monitor of this worker.
+    """
+    return loop_lag_monitor.metrics()
@@ -0,0 +1,101 @@
+"""
+Write '.br' and '.gz' sidecars next to the compressible files of the exported frontend.
+
+Run it once after 'reflex export', from the root directory of the project:
+
+    python -m app.backend.static_files.precompress app/frontend/customer_app/.web/_static
+
+SPAStaticFiles then serves the sidecars directly, instead of compressing the same
+files on every request.
+"""
+
+import gzip
+import os
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Brotli sidecars are optional.
+    brotli = None
+
+# Only text-based assets benefit from compression:
+COMPRESSIBLE_SUFFIXES = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".mjs",
+    ".svg",
+    ".txt",
+    ".xml",
+}
+
+# Files smaller than this are not worth a sidecar:
+MINIMUM_SIZE = 1000
+
+
+def precompress_file(path: Path) -> list:
+    """
+    Write the sidecars of a single file.
+
+    Args:
+        path (Path): The file to compress.
+
+    Returns:
+        list: The sidecars written. A sidecar that is not smaller than the original is skipped.
+    """
+    data = path.read_bytes()
+    written = []
+
+    variants = [(".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda: brotli.compress(data, quality=11)))
+
+    for suffix, compress in variants:
+        sidecar = path.with_name(path.name + suffix)
+        compressed = compress()
+        if len(compressed) >= len(data):
+            if sidecar.exists():
+                sidecar.unlink()
+            continue
+        sidecar.write_bytes(compressed)
+        written.append(sidecar)
+
+    return written
+
+
+def precompress_directory(directory: Path) -> int:
+    """
+    Write the sidecars of every compressible file under a directory.
+
+    Args:
+        directory (Path): The exported static directory.
+
+    Returns:
+        int: The number of sidecars written.
+    """
+    count = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = Path(root) / name
+            if path.suffix not in COMPRESSIBLE_SUFFIXES:
+                continue
+            if path.stat().st_size < MINIMUM_SIZE:
+                continue
+            count += len(precompress_file(path))
+    return count
+
+
+if __name__ == "__main__":
+    static_directory = Path(
+        sys.argv[1] if len(sys.argv) > 1 else "app/frontend/customer_app/.web/_static"
+    )
+    if not static_directory.is_dir():
+        sys.exit(f"Static directory '{static_directory}' does not exist.")
+
+    if brotli is None:
+        print("brotli is not installed, only writing '.gz' sidecars.")
+
+    print(f"Wrote {precompress_directory(static_directory)} sidecar files.")
@@ -0,0 +1,251 @@
+"""
+Module for serving the exported Reflex (Next.js) frontend.
+"""
+
+import hashlib
+import os
+import stat
+import time
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import anyio.to_thread
+from fastapi import HTTPException
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import URL, Headers
+from starlette.responses import FileResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from app.backend.middleware.compression import parse_accept_encoding
+
+# Sidecar files written by 'app.backend.static_files.precompress' at export time,
+# in order of preference:
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Next.js puts its content-hashed build output under this prefix:
+FINGERPRINTED_PREFIX = "_next/static/"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Small HTML documents are requested on every navigation, so they are kept in memory:
+IN_MEMORY_SUFFIXES = (".html",)
+IN_MEMORY_MAX_SIZE = 256 * 1024
+
+
+class _IndexedFile(NamedTuple):
+    """A static file, as recorded in the index built at startup."""
+
+    full_path: str
+    stat_result: os.stat_result
+    media_type: str
+    etag: str
+    cache_control: str
+    sidecars: Dict[str, Tuple[str, os.stat_result]]
+    # Contents of the file and of its sidecars, for the files held in memory:
+    body: Optional[bytes]
+    encoded_bodies: Dict[str, bytes]
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Return the set of encodings accepted (with a non-zero quality) by the client."""
+    return {
+        encoding
+        for encoding, quality in parse_accept_encoding(accept_encoding).items()
+        if quality > 0
+    }
+
+
+def content_etag(full_path: str) -> str:
+    """Return a strong ETag derived from the content of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(full_path, "rb") as file:
+        for chunk in iter(lambda: file.read(64 * 1024), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()}"'
+
+
+# Define a subclass of StaticFiles to create a custom static file handler
+# that supports client-side routing in Single Page Applications (SPAs).
+class SPAStaticFiles(StaticFiles):
+    """
+    Static files handler for the exported frontend.
+
+    The static directory is indexed once, when the handler is created, so requests
+    are resolved with a dictionary lookup instead of filesystem calls. On top of the
+    StaticFiles behaviour, it:
+
+    1. Falls back to 'index.html' for unknown paths, so client-side routes work.
+    2. Serves the '.br'/'.gz' sidecar of a file when the client accepts that encoding.
+    3. Marks the fingerprinted '_next/static' assets as immutable, and gives every
+       other file a strong, content-based ETag so browsers revalidate cheaply.
+    4. Holds small HTML documents, such as 'index.html', in memory.
+
+    Args:
+        reload_interval (float, optional): Re-index the directory when the index is older
+            than this many seconds. By default, the index is only built at startup.
+    """
+
+    def __init__(self, *args, reload_interval: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reload_interval = reload_interval
+        self._index: Dict[str, _IndexedFile] = {}
+        self._directories: set = set()
+        self._indexed_at = 0.0
+        self.reload_index()
+
+    def reload_index(self):
+        """Walk the static directories and rebuild the file index."""
+        index: Dict[str, _IndexedFile] = {}
+        directories = set()
+
+        for directory in self.all_directories:
+            root = os.path.realpath(directory)
+            for current, _, files in os.walk(root, followlinks=self.follow_symlink):
+                relative_dir = os.path.relpath(current, root).replace(os.sep, "/")
+                relative_dir = "" if relative_dir == "." else relative_dir
+                directories.add(relative_dir)
+
+                for name in files:
+                    key = f"{relative_dir}/{name}" if relative_dir else name
+                    if key not in index:
+                        entry = self._index_file(key, os.path.join(current, name))
+                        if entry is not None:
+                            index[key] = entry
+
+        self._index = index
+        self._directories = directories
+        self._indexed_at = time.monotonic()
+
+    def _index_file(self, key: str, full_path: str) -> Optional[_IndexedFile]:
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        sidecars = {}
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            try:
+                sidecar_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            # Ignore sidecars left over from a previous export:
+            if sidecar_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+                sidecars[encoding] = (full_path + suffix, sidecar_stat)
+
+        body, encoded_bodies = None, {}
+        if key.endswith(IN_MEMORY_SUFFIXES) and stat_result.st_size <= IN_MEMORY_MAX_SIZE:
+            with open(full_path, "rb") as file:
+                body = file.read()
+            for encoding, (sidecar_path, _) in sidecars.items():
+                with open(sidecar_path, "rb") as file:
+                    encoded_bodies[encoding] = file.read()
+
+        return _IndexedFile(
+            full_path=full_path,
+            stat_result=stat_result,
+            media_type=guess_type(full_path)[0] or "text/plain",
+            etag=content_etag(full_path),
+            cache_control=(
+                IMMUTABLE_CACHE_CONTROL
+                if key.startswith(FINGERPRINTED_PREFIX)
+                else REVALIDATE_CACHE_CONTROL
+            ),
+            sidecars=sidecars,
+            body=body,
+            encoded_bodies=encoded_bodies,
+        )
+
+    # Override the get_response method, which is responsible for retrieving
+    # static file responses for given paths.
+    async def get_response(self, path: str, scope):
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+
+        if (
+            self.reload_interval is not None
+            and time.monotonic() - self._indexed_at > self.reload_interval
+        ):
+            # Mark the index as fresh first, so concurrent requests don't reload it too:
+            self._indexed_at = time.monotonic()
+            await anyio.to_thread.run_sync(self.reload_index)
+
+        key = path.replace(os.sep, "/")
+        key = "" if key == "." else key
+
+        entry = self._index.get(key)
+        if entry is not None:
+            return self.indexed_file_response(entry, scope)
+
+        if self.html and key in self._directories:
+            # We're in HTML mode, and have got a directory URL.
+            entry = self._index.get(f"{key}/index.html" if key else "index.html")
+            if entry is not None:
+                if not scope["path"].endswith("/"):
+                    # Directory URLs should redirect to always end in "/".
+                    url = URL(scope=scope)
+                    return RedirectResponse(url=url.replace(path=url.path + "/"))
+                return self.indexed_file_response(entry, scope)
+
+        if self.html and "404.html" in self._index:
+            return self.indexed_file_response(self._index["404.html"], scope, 404)
+
+        # Client-side route: serve the SPA entry point.
+        entry = self._index.get("index.html")
+        if entry is not None:
+            return self.indexed_file_response(entry, scope)
+
+        raise HTTPException(status_code=404)
+
+    def indexed_file_response(
+        self, entry: _IndexedFile, scope, status_code: int = 200
+    ) -> Response:
+        """Build the response for an indexed file, negotiating its precompressed variants."""
+        request_headers = Headers(scope=scope)
+
+        headers = {
+            "Cache-Control": entry.cache_control,
+            "Last-Modified": formatdate(entry.stat_result.st_mtime, usegmt=True),
+        }
+        if entry.sidecars:
+            headers["Vary"] = "Accept-Encoding"
+
+        # Serve the precompressed variant, if the client accepts one we have:
+        encoding = None
+        encodings = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for candidate, _ in PRECOMPRESSED_ENCODINGS:
+            if candidate in encodings and candidate in entry.sidecars:
+                encoding = candidate
+                headers["Content-Encoding"] = encoding
+                break
+
+        # Each representation needs its own strong validator:
+        headers["ETag"] = (
+            f'{entry.etag[:-1]}-{encoding}"' if encoding is not None else entry.etag
+        )
+
+        if self.is_not_modified(Headers(headers=headers), request_headers):
+            return NotModifiedResponse(Headers(headers=headers))
+
+        if entry.body is not None:
+            body = entry.encoded_bodies[encoding] if encoding else entry.body
+            return Response(
+                body,
+                status_code=status_code,
+                media_type=entry.media_type,
+                headers=headers,
+            )
+
+        path, stat_result = (
+            entry.sidecars[encoding] if encoding else (entry.full_path, entry.stat_result)
+        )
+        return FileResponse(
+            path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type=entry.media_type,
+            headers=headers,
+        )
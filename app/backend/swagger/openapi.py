@@ -0,0 +1,73 @@
+"""
+Module for caching the OpenAPI schema of the application.
+"""
+
+import hashlib
+import json
+import threading
+
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+
+
+class OpenAPISchemaCache:
+    """
+    Build the OpenAPI schema once, and keep it as serialized bytes with an ETag.
+
+    The schema is rebuilt only when the routes of the application change.
+    """
+
+    def __init__(self):
+        self._routes_key = None
+        self._body = b""
+        self._etag = ""
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_routes_key(app: FastAPI) -> tuple:
+        return tuple((id(route), getattr(route, "path", None)) for route in app.routes)
+
+    def get(self, app: FastAPI) -> tuple[bytes, str]:
+        """
+        Return the serialized schema of the application and its ETag.
+
+        Args:
+            app (FastAPI): The application to describe.
+
+        Returns:
+            tuple[bytes, str]: The JSON encoded schema, and its (strong) ETag.
+        """
+        routes_key = self._get_routes_key(app)
+        if routes_key == self._routes_key:
+            return self._body, self._etag
+
+        with self._lock:
+            if routes_key != self._routes_key:
+                schema = get_openapi(
+                    title=app.title,
+                    version=app.version,
+                    description=app.description,
+                    routes=app.routes,
+                )
+                body = json.dumps(schema, separators=(",", ":")).encode("utf-8")
+                self._body = body
+                self._etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+                self._routes_key = routes_key
+
+        return self._body, self._etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag.
+
+    The header is '*' or a comma-separated list of entity tags, compared whole. As
+    required for If-None-Match, the comparison is weak: 'W/' prefixes are ignored.
+    """
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (
+        tag.removeprefix("W/") for tag in tags
+    )
+
+
+openapi_schema_cache = OpenAPISchemaCache()
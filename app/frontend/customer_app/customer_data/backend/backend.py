@@ -1,13 +1,64 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Union,
+)
 
 import httpx
 import reflex as rx
 
 from ..config import settings
+from .client import (
+    BackendUnavailable,
+    backend_request,
+    circuit_breaker,
+    get_client,
+    import_backend_object,
+)
 
-# Base URL for the FastAPI backend.
-BASE_URL = f"{settings.fastapi_host}/api"
+# Prefix of the FastAPI backend endpoints, relative to settings.fastapi_host.
+BASE_URL = "/api"
+
+# Customers per page of the dashboard table, and the page sizes offered.
+DEFAULT_PAGE_SIZE = 25
+PAGE_SIZES = ["10", "25", "50", "100"]
+
+# Delay without a new keystroke before a search is executed, in seconds.
+SEARCH_DEBOUNCE_SECONDS = 0.3
+
+# Search requests in flight on this worker, by client token, so a newer search can cancel them.
+_pending_searches: dict[str, asyncio.Task] = {}
+
+# Broadcaster of the customer changes, subscribed to directly when FastAPI runs in-process
+# (the ASGI transport buffers whole responses, so it can't stream events):
+CHANGE_BROADCASTER = "app.backend.customer.events:customer_changes"
+
+# The event stream is silent for at most this long (the backend sends keepalives),
+# and is reopened after this delay when it drops, in seconds:
+EVENTS_IDLE_SECONDS = 15
+EVENTS_RETRY_SECONDS = 5
+
+# Change watchers running on this worker, by client token, so that a client has only one.
+_change_watchers: dict[str, asyncio.Task] = {}
+
+# Events queued for a session of the change feed, beyond which the oldest are dropped
+# (only the latest change sequence matters):
+CHANGE_FEED_QUEUE_SIZE = 16
+
+# Backend responses kept by the cache shared by the sessions of a worker, and their maximum
+# age in seconds. Entries are dropped sooner, as soon as a newer change is seen.
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_AGE_SECONDS = 5.0
 
 
 def _get_percentage_change(
@@ -34,6 +85,8 @@ class Customer(rx.Base):
     date: str = ""
     payments: float = 0.0
     status: str = ""
+    seq: int = 0
+    version: int = 0
 
 
 class MonthValues(rx.Base):
@@ -44,21 +97,433 @@ class MonthValues(rx.Base):
     num_delivers: int = 0
 
 
+class CustomerPage(NamedTuple):
+    """A page of customers, as returned by the FastAPI backend."""
+
+    customers: list[Customer]
+    # Number of customers matching the search, on all pages:
+    total: int
+    # Change sequence of the data, to fetch later changes from:
+    seq: int
+    # Served from the cache, because the backend failed:
+    stale: bool = False
+
+
+class CustomerStats(NamedTuple):
+    """Dashboard values of the customers matching a search."""
+
+    current: MonthValues
+    previous: MonthValues
+    seq: int
+    stale: bool = False
+
+
+class CustomerChanges(NamedTuple):
+    """Customers changed or deleted since a change sequence."""
+
+    seq: int
+    changed: list[Customer]
+    deleted: list[int]
+    has_more: bool
+    stale: bool = False
+
+
+class _CacheEntry(NamedTuple):
+    value: NamedTuple
+    seq: int
+    fetched_at: float
+
+
+class SharedCache:
+    """
+    Cache of backend responses, shared by all the sessions of a Reflex worker.
+
+    Sessions showing the same view get the same response, and concurrent requests for
+    the same key are coalesced into one backend call. Cached values carry the change
+    sequence they were fetched at. Seeing a newer sequence, from a change event or from
+    a write, makes every older entry outdated.
+
+    While the backend fails, the last good value of a key is served instead, with its
+    'stale' field set.
+
+    Cached values are shared: sessions must copy them before mutating them. A caller
+    cancelled while waiting for a request only cancels it if no other caller waits for
+    it, e.g. a superseded search.
+
+    Args:
+        max_entries (int): The number of entries kept, least recently used first out.
+        max_age (float): The age of an entry after which it is fetched again, in seconds,
+            for the changes this worker has not been told about.
+    """
+
+    def __init__(
+        self, max_entries: int = CACHE_MAX_ENTRIES, max_age: float = CACHE_MAX_AGE_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        # Latest change sequence seen by this worker:
+        self.seq = 0
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._pending: dict[Hashable, tuple[int, asyncio.Task]] = {}
+        # Number of callers waiting for each request in flight:
+        self._waiters: dict[asyncio.Task, int] = {}
+
+    def observe_seq(self, seq: int):
+        """Record a change sequence seen by this worker."""
+        self.seq = max(self.seq, seq)
+
+    async def get(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Optional[NamedTuple]]]
+    ):
+        """
+        Return the cached value of a key, or fetch it.
+
+        Args:
+            key (Hashable): The key of the request, e.g. its endpoint and parameters.
+            fetch (Callable): Fetch the value, a NamedTuple with 'seq' and 'stale' fields,
+                or None on failure. Failures are not cached.
+
+        Returns:
+            The value, or None.
+
+        Raises:
+            BackendUnavailable: If the backend failed, and there is no value to fall back on.
+        """
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry.seq >= self.seq
+            and time.monotonic() - entry.fetched_at <= self.max_age
+        ):
+            self._entries.move_to_end(key)
+            return entry.value
+
+        # Join a request in flight, unless it started before a change we know of:
+        pending = self._pending.get(key)
+        if pending is None or pending[0] < self.seq:
+            pending = (self.seq, asyncio.create_task(self._load(key, fetch)))
+            self._pending[key] = pending
+
+        # A cancelled caller must not cancel the request of the others, but the last
+        # caller waiting for it does:
+        task = pending[1]
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            value = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                task.cancel()
+                # No new caller may join the cancelled request:
+                if self._pending.get(key, (0, None))[1] is task:
+                    del self._pending[key]
+            raise
+        except BackendUnavailable:
+            if entry is None:
+                raise
+            value = None
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+        if value is None and entry is not None:
+            # Serve the last good value while the backend fails:
+            return entry.value._replace(stale=True)
+        return value
+
+    async def _load(self, key: Hashable, fetch):
+        try:
+            value = await fetch()
+        finally:
+            if self._pending.get(key, (0, None))[1] is asyncio.current_task():
+                del self._pending[key]
+
+        if value is not None:
+            self.observe_seq(value.seq)
+            self._entries[key] = _CacheEntry(value, value.seq, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+customer_cache = SharedCache()
+
+
+async def fetch_customers(params: dict) -> Optional[CustomerPage]:
+    """
+    Fetch a page of customers from the FastAPI backend, through the worker cache.
+
+    Args:
+        params (dict): The search, sort and pagination query parameters.
+
+    Returns:
+        Optional[CustomerPage]: The customers of the page, or None if the backend did not
+        return them.
+    """
+    return await customer_cache.get(
+        ("customers", tuple(sorted(params.items()))),
+        lambda: _request_customers(params),
+    )
+
+
+async def _request_customers(params: dict) -> Optional[CustomerPage]:
+    # Only the fields of the table, one array per column, without repeating the keys:
+    params = {**params, "fields": ",".join(Customer.__fields__), "format": "columnar"}
+    response = await backend_request("GET", f"{BASE_URL}/customers", params=params)
+    if response.status_code != 200:
+        return None
+    columns = response.json()["columns"]
+    customers = [
+        Customer(**dict(zip(columns, values))) for values in zip(*columns.values())
+    ]
+    return CustomerPage(
+        customers=customers,
+        total=int(response.headers.get("X-Total-Count", len(customers))),
+        seq=int(response.headers.get("X-Change-Seq", 0)),
+    )
+
+
+async def fetch_changes(since: int) -> Optional[CustomerChanges]:
+    """
+    Fetch the customers changed or deleted after a change sequence, through the cache.
+
+    Returns:
+        Optional[CustomerChanges]: The changes, or None if the backend did not return them.
+    """
+    return await customer_cache.get(("changes", since), lambda: _request_changes(since))
+
+
+async def _request_changes(since: int) -> Optional[CustomerChanges]:
+    response = await backend_request(
+        "GET", f"{BASE_URL}/customers/changes", params={"since": since}
+    )
+    if response.status_code != 200:
+        return None
+    changes = response.json()
+    return CustomerChanges(
+        seq=changes["seq"],
+        changed=[Customer(**customer) for customer in changes["changed"]],
+        deleted=changes["deleted"],
+        has_more=changes["has_more"],
+    )
+
+
+async def fetch_stats(search: str) -> Optional[CustomerStats]:
+    """
+    Fetch the dashboard values of the customers matching a search, through the worker cache.
+
+    Returns:
+        Optional[CustomerStats]: The current and previous month values, or None if the
+        backend did not return them.
+    """
+    return await customer_cache.get(("stats", search), lambda: _request_stats(search))
+
+
+async def _request_stats(search: str) -> Optional[CustomerStats]:
+    params = {"search": search} if search else {}
+    response = await backend_request(
+        "GET", f"{BASE_URL}/customers/stats", params=params
+    )
+    if response.status_code != 200:
+        return None
+    stats = response.json()
+    return CustomerStats(
+        current=MonthValues(**stats["current"]),
+        previous=MonthValues(**stats["previous"]),
+        seq=int(response.headers.get("X-Change-Seq", 0)),
+    )
+
+
+async def customer_change_events() -> AsyncIterator[Optional[int]]:
+    """
+    Subscribe to the customer changes of the FastAPI backend.
+
+    Yields:
+        Optional[int]: The latest change sequence, first when subscribing and then whenever
+        customers change. None is yielded when the stream is idle, at least every
+        EVENTS_IDLE_SECONDS.
+    """
+    if settings.fastapi_in_process:
+        broadcaster = import_backend_object(CHANGE_BROADCASTER)
+        async with broadcaster.subscribe() as queue:
+            seq = await asyncio.to_thread(broadcaster.read_seq)
+            yield seq
+            while True:
+                try:
+                    new_seq = await asyncio.wait_for(queue.get(), EVENTS_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if new_seq > seq:
+                    seq = new_seq
+                    yield seq
+        return
+
+    if circuit_breaker.state == "open":
+        raise BackendUnavailable("The backend is unavailable, try again later")
+
+    # A read timeout of a few keepalive intervals detects dead connections:
+    timeout = httpx.Timeout(
+        settings.http_timeout,
+        connect=settings.http_connect_timeout,
+        read=EVENTS_IDLE_SECONDS * 4,
+    )
+    async with get_client().stream(
+        "GET", f"{BASE_URL}/customers/events", timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                yield json.loads(line[5:])["seq"]
+            elif line.startswith(":"):
+                yield None
+
+
+class ChangeFeed:
+    """
+    Subscription to the customer changes, shared by all the sessions of a worker.
+
+    A single event stream is opened to the backend while at least one session listens,
+    instead of one per session, which would hold a connection of the shared pool each.
+    Its events are copied to the queue of every session: the change sequences, None
+    when the stream is idle, and the error interrupting the stream, if any. The stream
+    is reopened after EVENTS_RETRY_SECONDS.
+    """
+
+    def __init__(self):
+        # Latest change sequence received, sent first to the new subscribers:
+        self.seq: Optional[int] = None
+        self._queues: set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        """Receive the events of the feed in a queue, while in the context."""
+        queue: asyncio.Queue = asyncio.Queue(CHANGE_FEED_QUEUE_SIZE)
+        if self.seq is not None:
+            queue.put_nowait(self.seq)
+        self._queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            yield queue
+        finally:
+            self._queues.discard(queue)
+            if not self._queues and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def _publish(self, event: Union[int, None, Exception]):
+        for queue in self._queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _run(self):
+        while self._queues:
+            try:
+                async for seq in customer_change_events():
+                    if seq is not None:
+                        self.seq = seq
+                    self._publish(seq)
+            except Exception as e:
+                print(f"Customer change events interrupted: {e}")
+                self.seq = None
+                self._publish(e)
+            await asyncio.sleep(EVENTS_RETRY_SECONDS)
+
+
+change_feed = ChangeFeed()
+
+
+async def fetch_view(params: dict) -> tuple:
+    """Fetch a page of customers and the stats of its search, concurrently."""
+    return await asyncio.gather(
+        fetch_customers(params), fetch_stats(params.get("search", ""))
+    )
+
+
+def _matches_search(customer: Customer, search: str) -> bool:
+    """Mirror the search filter of the FastAPI backend (case-insensitive 'contains')."""
+    if not search:
+        return True
+    search = search.lower()
+    return any(
+        search in str(value).lower()
+        for value in (
+            customer.name,
+            customer.email,
+            customer.phone,
+            customer.address,
+            customer.payments,
+            customer.status,
+        )
+    )
+
+
+def _client_is_connected(client_token: str) -> bool:
+    """Whether a client is still connected to this worker."""
+    from ..customer_data import app
+
+    namespace = app.event_namespace
+    return namespace is None or client_token in namespace.token_to_sid
+
+
+def _get_stats_period(customer: Customer, now: datetime) -> Optional[str]:
+    """
+    Return the stats period a customer counts in: "current", "previous", or None.
+
+    Uses the same windows as the /customers/stats endpoint of the FastAPI backend.
+    Dates are 'YYYY-MM-DD' strings, which sort like dates, so they are not parsed.
+    """
+    start_of_month = datetime(now.year, 1, 1)
+    if customer.date >= start_of_month.strftime("%Y-%m-%d"):
+        return "current"
+
+    last_day_of_last_month = start_of_month - timedelta(days=1)
+    start_of_last_month = last_day_of_last_month.replace(day=1)
+    if (
+        start_of_last_month.strftime("%Y-%m-%d")
+        <= customer.date
+        <= last_day_of_last_month.strftime("%Y-%m-%d")
+    ):
+        return "previous"
+    return None
+
+
 class State(rx.State):
     """The app state."""
 
+    # Only the visible page of customers is kept in the state:
     users: list[Customer] = []
+    total: int = 0
+    page: int = 0
+    page_size: int = DEFAULT_PAGE_SIZE
     sort_value: str = ""
     sort_reverse: bool = False
     search_value: str = ""
     current_user: Customer = Customer()
+    edit_dialog_open: bool = False
     current_month_values: MonthValues = MonthValues()
     previous_month_values: MonthValues = MonthValues()
+    # The backend is failing: the data shown may be outdated.
+    backend_stale: bool = False
 
-    def load_entries(self):
-        """Load customers from FastAPI backend."""
+    # Incremented by every load, so that an outdated search result is never applied.
+    _search_generation: int = 0
 
-        params = {}
+    # Search and sort of the loaded view, and the change sequence it is up to date with.
+    # While the view is unchanged, only the changes since that sequence are fetched.
+    _loaded_view: Optional[tuple] = None
+    _change_seq: int = 0
+
+    def _get_view(self) -> tuple:
+        return (self.search_value, self.sort_value, self.sort_reverse)
+
+    def _get_query_params(self) -> dict:
+        """Return the search, sort and pagination parameters of the current view."""
+        params = {"limit": self.page_size, "offset": self.page * self.page_size}
 
         # Add search and sort parameters to the request
         if self.search_value:
@@ -67,142 +532,495 @@ class State(rx.State):
             params["sort_by"] = self.sort_value
             params["sort_order"] = "desc" if self.sort_reverse else "asc"
 
-        # Make the API request
-        try:
-            response = httpx.get(
-                f"{BASE_URL}/customers",
-                params=params,
-            )
+        return params
+
+    def _set_users(self, page: Optional[CustomerPage]):
+        """Apply a fetched page of customers."""
+        if page is not None:
+            # Copy the list, which is shared through the cache:
+            self.users, self.total = list(page.customers), page.total
+
+    def _set_stats(self, stats: Optional[CustomerStats]):
+        """Apply fetched month values."""
+        if stats is None:
+            return
+        current, previous = stats.current, stats.previous
+
+        self.current_month_values = current
+        # We add some dummy values to simulate growth/decline. Remove them in production.
+        self.previous_month_values = MonthValues(
+            num_customers=previous.num_customers + 3,
+            total_payments=previous.total_payments + 240,
+            num_delivers=previous.num_delivers + 5,
+        )
+
+    def _set_view(
+        self,
+        page: Optional[CustomerPage],
+        stats: Optional[CustomerStats],
+    ):
+        """Apply a fully fetched view: the page of customers and the stats."""
+        self._set_users(page)
+        self._set_stats(stats)
+        self.backend_stale = any(
+            values is not None and values.stale for values in (page, stats)
+        )
+        if page is not None and stats is not None and not self.backend_stale:
+            self._loaded_view = self._get_view()
+            self._change_seq = page.seq
+        else:
+            # Load the view again next time:
+            self._loaded_view = None
+
+    def _acknowledge_change(self, seq: int):
+        """
+        Record a change made, and already applied, by this state.
+
+        Only a change directly following the loaded data can be skipped by the next sync.
+        """
+        # Cached data of the other sessions is outdated too:
+        customer_cache.observe_seq(seq)
+        if seq == self._change_seq + 1:
+            self._change_seq = seq
+
+    async def load_entries(self):
+        """
+        Load the current page of customers, and the stats, from FastAPI backend.
 
+        Once a view is loaded, only the customers changed since are fetched and merged.
+        """
+
+        # Supersede any search still waiting or in flight:
+        self._search_generation += 1
+
+        # Make the API requests
+        try:
+            await self._refresh()
+        except BackendUnavailable as e:
+            self.backend_stale = True
+            return rx.toast.error(f"{e}", position="bottom-right")
         except Exception as e:
             return rx.toast.error(f"Error: {e}", position="bottom-right")
 
-        if response.status_code == 200:
-            self.users = [Customer(**customer) for customer in response.json()]
+    async def _refresh(self):
+        """Bring the view up to date: merge the changes since it was loaded, or load it."""
+        if self._loaded_view == self._get_view():
+            await self._sync_changes()
+        else:
+            self._set_view(*await fetch_view(self._get_query_params()))
+
+    async def _sync_changes(self):
+        """Merge the customers changed since the last load into the page."""
+        changes = await fetch_changes(self._change_seq)
+        missing = self._merge_changes(changes)
+        if missing == "view":
+            self._set_view(*await fetch_view(self._get_query_params()))
+        elif missing == "stats":
+            self._set_synced_stats(await fetch_stats(self.search_value))
+
+    def _merge_changes(self, changes: Optional[CustomerChanges]) -> Optional[str]:
+        """
+        Merge fetched changes into the page.
+
+        Returns:
+            Optional[str]: What remains to be fetched: "view" to load the view again,
+            "stats" for the stats of the merged page, or None.
+        """
+        if changes is not None and changes.stale:
+            # The backend is failing: keep the page as it is.
+            self.backend_stale = True
+            return None
+        if changes is None or changes.has_more:
+            # Too many changes to merge: load the view again.
+            return "view"
+        if not changes.changed and not changes.deleted:
+            self._change_seq = changes.seq
+            self.backend_stale = False
+            return None
+
+        # Rows outside the page may have moved into it, or out of the search total:
+        reload = False
+        for customer_id in changes.deleted:
+            reload = self._remove_user(customer_id) is None or reload
+        for customer in changes.changed:
+            if self._remove_user(customer.id) is None:
+                reload = True
+            else:
+                reload = self._insert_user(customer) or reload
+
+        if reload or self._page_is_underfilled():
+            return "view"
+
+        # The page is up to date. The stats come from a single aggregate query, which is
+        # cheaper than keeping track of the previous values of every changed row:
+        self._change_seq = changes.seq
+        return "stats"
+
+    def _set_synced_stats(self, stats: Optional[CustomerStats]):
+        """Apply the stats fetched after merging changes into the page."""
+        self._set_stats(stats)
+        self.backend_stale = stats is not None and stats.stale
+        if stats is None or stats.stale:
+            # Load the view again next time:
+            self._loaded_view = None
+
+    async def _follow_change(self, seq: int):
+        """
+        Bring the view up to date after a change event, from a background task.
+
+        The data is fetched without holding the state lock, which would block the events
+        of the user meanwhile, then applied if the view is still the same.
+        """
+        async with self:
+            view = self._get_view()
+            synced = self._loaded_view == view
+            # A view being loaded, e.g. a new search, gets fresh data anyway. A stale
+            # view is refreshed, now that the backend answers again:
+            if not self.backend_stale and not (synced and seq > self._change_seq):
+                return
+            since, params = self._change_seq, self._get_query_params()
+
+        missing = "view"
+        if synced:
+            changes = await fetch_changes(since)
+            async with self:
+                if self._get_view() != view or self._change_seq != since:
+                    # The page changed meanwhile: start over from its new state.
+                    retry = True
+                else:
+                    retry = False
+                    missing = self._merge_changes(changes)
+            if retry:
+                return await self._follow_change(seq)
+
+        if missing == "view":
+            page, stats = await fetch_view(params)
+            async with self:
+                if self._get_view() == view:
+                    self._set_view(page, stats)
+        elif missing == "stats":
+            stats = await fetch_stats(params.get("search", ""))
+            async with self:
+                if self._get_view() == view:
+                    self._set_synced_stats(stats)
+
+    async def _reload_page(self):
+        """Load the current page of customers only; the stats are unchanged."""
+        self._search_generation += 1
+        page = await fetch_customers(self._get_query_params())
+        self._set_users(page)
+        if page is not None and page.stale:
+            self.backend_stale = True
+
+    def _page_is_underfilled(self) -> bool:
+        """Whether rows after the current page could fill it up, e.g. after a deletion."""
+        offset = self.page * self.page_size
+        return len(self.users) < self.page_size and offset + len(self.users) < self.total
+
+    def _update_stats(self, customer: Customer, sign: int):
+        """Add (sign=1) or remove (sign=-1) a customer from the month values."""
+        period = _get_stats_period(customer, datetime.now())
+        if period is None:
+            return
+
+        values = (
+            self.current_month_values
+            if period == "current"
+            else self.previous_month_values
+        )
+        values = MonthValues(
+            num_customers=values.num_customers + sign,
+            total_payments=values.total_payments + sign * customer.payments,
+            num_delivers=values.num_delivers
+            + (sign if customer.status == "Delivered" else 0),
+        )
+
+        if period == "current":
+            self.current_month_values = values
+        else:
+            self.previous_month_values = values
 
-        self.get_current_month_values()
-        self.get_previous_month_values()
+    def _insert_user(self, customer: Customer) -> bool:
+        """
+        Count a new customer, and insert it in the page if it sorts within it.
 
-    def add_customer_to_db(self, form_data: dict):
+        Returns:
+            bool: True if the position of the customer can't be decided from the page alone,
+            so the page must be reloaded.
+        """
+        if not _matches_search(customer, self.search_value):
+            return False
+
+        self.total += 1
+        self._update_stats(customer, 1)
+
+        # Without a sort column, the backend returns customers in id order:
+        sort_value = self.sort_value or "id"
+        key = getattr(customer, sort_value)
+
+        position = len(self.users)
+        for index, user in enumerate(self.users):
+            user_key = getattr(user, sort_value)
+            if (user_key < key) if self.sort_reverse else (user_key > key):
+                position = index
+                break
+
+        if position == 0 and self.page > 0:
+            return True
+        if position == len(self.users):
+            if len(self.users) == self.page_size:
+                # It belongs to a following page.
+                return False
+            # The page is not full: the customer goes at its end, unless other rows follow.
+            rows_after_page = self.total - 1 - self.page * self.page_size - len(self.users)
+            if rows_after_page > 0:
+                return True
+
+        self.users.insert(position, customer)
+        if len(self.users) > self.page_size:
+            self.users.pop()
+        return False
+
+    def _remove_user(self, customer_id: int) -> Optional[Customer]:
+        """Remove a customer from the page, if present, and return it."""
+        for index, user in enumerate(self.users):
+            if user.id == customer_id:
+                del self.users[index]
+                self.total -= 1
+                self._update_stats(user, -1)
+                return user
+        return None
+
+    async def add_customer_to_db(self, form_data: dict):
         """Add customer to the database."""
         new_customer = Customer(date=datetime.now().strftime("%Y-%m-%d"), **form_data)
 
         try:
             # Add new customer
-            response = httpx.post(
+            response = await backend_request(
+                "POST",
                 f"{BASE_URL}/customers",
                 json=[new_customer.dict()],
             )
             if response.status_code == 200:
-                self.load_entries()
+                # Patch the page with the created rows, instead of reloading it:
+                reload = False
+                for customer in response.json():
+                    customer = Customer(**customer)
+                    reload = self._insert_user(customer) or reload
+                    self._acknowledge_change(customer.seq)
+                if reload:
+                    await self._reload_page()
                 return rx.toast.info(
                     "Customer added successfully", position="bottom-right"
                 )
         except Exception as e:
             return rx.toast.error(f"Error {e}", position="bottom-right")
 
-    def update_customer_to_db(self, form_data: dict):
+    async def update_customer_to_db(self, form_data: dict):
         """Update customer through FastAPI."""
         customer_id = self.current_user.id
+        self.edit_dialog_open = False
 
         yield rx.toast.info("Updating customer...", position="bottom-right")
 
-        # Update the customer in the database
+        # Update the customer in the database, only if nobody changed it since the
+        # dialog loaded it:
         try:
-            response = httpx.put(
+            response = await backend_request(
+                "PUT",
                 f"{BASE_URL}/customers/{customer_id}",
                 json=form_data,
+                headers={"If-Match": f'"{self.current_user.version}"'},
             )
-            if response.status_code == 200:
-                self.load_entries()
+            if response.status_code == 412:
+                # Show the changes of the other update:
+                customer_cache.observe_seq(
+                    int(response.headers.get("X-Change-Seq", 0))
+                )
+                await self._sync_changes()
+                yield rx.toast.warning(
+                    "Customer was changed by someone else, review it and try again",
+                    position="bottom-right",
+                )
+            elif response.status_code == 200:
+                # Re-insert the updated row, as its sort position or search match may change:
+                customer = Customer(**response.json())
+                self._remove_user(customer_id)
+                reload = self._insert_user(customer)
+                self._acknowledge_change(customer.seq)
+                if reload or self._page_is_underfilled():
+                    await self._reload_page()
                 yield rx.toast.info(
                     "Customer updated successfully", position="bottom-right"
                 )
         except Exception as e:
             yield rx.toast.error(f"Error: {e}", position="bottom-right")
 
-    def delete_customer(self, customer_id: int):
+    async def delete_customer(self, customer_id: int):
         """Delete customer through FastAPI."""
 
         try:
-            response = httpx.delete(
+            response = await backend_request(
+                "DELETE",
                 f"{BASE_URL}/customers/{customer_id}",
             )
             if response.status_code == 200:
-                self.load_entries()
+                seq = response.json().get("seq", 0)
+                if self._remove_user(customer_id) is not None:
+                    self._acknowledge_change(seq)
+                else:
+                    # Not on the page: the next sync applies it.
+                    customer_cache.observe_seq(seq)
+                if not self.users and self.page > 0:
+                    self.page -= 1
+                    await self._reload_page()
+                elif self._page_is_underfilled():
+                    # Backfill the page with the first row of the next one:
+                    await self._reload_page()
                 return rx.toast.info(
                     "Customer deleted successfully", position="bottom-right"
                 )
         except Exception as e:
-            yield rx.toast.error(f"Connection error {e}", position="bottom-right")
-
-    # Keep the following methods unchanged as they process local data
-    def get_current_month_values(self):
-        """Calculate current month's values."""
-
-        now = datetime.now()
-        start_of_month = datetime(now.year, 1, 1)
-
-        current_month_users = [
-            user
-            for user in self.users
-            if datetime.strptime(user.date, "%Y-%m-%d") >= start_of_month
-        ]
-        num_customers = len(current_month_users)
-        total_payments = sum(user.payments for user in current_month_users)
-        num_delivers = len(
-            [user for user in current_month_users if user.status == "Delivered"]
-        )
-        self.current_month_values = MonthValues(
-            num_customers=num_customers,
-            total_payments=total_payments,
-            num_delivers=num_delivers,
-        )
+            return rx.toast.error(f"Connection error {e}", position="bottom-right")
 
-    def get_previous_month_values(self):
-        """Calculate previous month's values."""
-        now = datetime.now()
-        first_day_of_current_month = datetime(now.year, 1, 1)
-        last_day_of_last_month = first_day_of_current_month - timedelta(days=1)
-        start_of_last_month = datetime(
-            last_day_of_last_month.year, last_day_of_last_month.month, 1
-        )
+    async def sort_values(self, sort_value: str):
+        self.sort_value = sort_value
+        self.page = 0
+        return await self.load_entries()
 
-        previous_month_users = [
-            user
-            for user in self.users
-            if start_of_last_month
-            <= datetime.strptime(user.date, "%Y-%m-%d")
-            <= last_day_of_last_month
-        ]
-        # We add some dummy values to simulate growth/decline. Remove them in production.
-        num_customers = len(previous_month_users) + 3
-        total_payments = sum(user.payments for user in previous_month_users) + 240
-        num_delivers = (
-            len([user for user in previous_month_users if user.status == "Delivered"])
-            + 5
-        )
+    async def toggle_sort(self):
+        self.sort_reverse = not self.sort_reverse
+        self.page = 0
+        return await self.load_entries()
 
-        self.previous_month_values = MonthValues(
-            num_customers=num_customers,
-            total_payments=total_payments,
-            num_delivers=num_delivers,
-        )
+    @rx.event(background=True)
+    async def filter_values(self, search_value: str):
+        """
+        Search customers, once the user has stopped typing.
 
-    def sort_values(self, sort_value: str):
-        self.sort_value = sort_value
-        return self.load_entries()
+        Every keystroke starts a new generation. A search only runs if no newer keystroke
+        arrived during the debounce delay, and a newer search cancels the request of an
+        older one. Only the result of the latest search is applied.
+        """
+        async with self:
+            self.search_value = search_value
+            self.page = 0
+            self._search_generation += 1
+            generation = self._search_generation
+            client_token = self.router.session.client_token
 
-    def toggle_sort(self):
-        self.sort_reverse = not self.sort_reverse
-        return self.load_entries()
+        await asyncio.sleep(SEARCH_DEBOUNCE_SECONDS)
+
+        async with self:
+            if generation != self._search_generation:
+                return
+            params = self._get_query_params()
 
-    def filter_values(self, search_value):
-        self.search_value = search_value
-        return self.load_entries()
+        # Cancel the request of the previous search of this client, if still in flight:
+        request = asyncio.create_task(fetch_view(params))
+        previous_request = _pending_searches.get(client_token)
+        if previous_request is not None:
+            previous_request.cancel()
+        _pending_searches[client_token] = request
+
+        try:
+            page, stats = await request
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            return rx.toast.error(f"Error: {e}", position="bottom-right")
+        finally:
+            if _pending_searches.get(client_token) is request:
+                del _pending_searches[client_token]
+
+        async with self:
+            if generation != self._search_generation:
+                return
+            self._set_view(page, stats)
+
+    @rx.event(background=True)
+    async def watch_changes(self):
+        """
+        Merge the changes pushed by the FastAPI backend, while the table is mounted.
+
+        Runs until 'stop_watching_changes' is called, or the client disconnects. The
+        events only carry the change sequence, so missed events are caught up with.
+        """
+        async with self:
+            client_token = self.router.session.client_token
+
+        # Replace the watcher of a previous mount of this client:
+        watcher = asyncio.current_task()
+        previous_watcher = _change_watchers.get(client_token)
+        if previous_watcher is not None:
+            previous_watcher.cancel()
+        _change_watchers[client_token] = watcher
+
+        try:
+            async with change_feed.subscribe() as events:
+                while _client_is_connected(client_token):
+                    event = await events.get()
+                    # The error interrupting the stream is shared by the sessions:
+                    failed = isinstance(event, (BackendUnavailable, httpx.HTTPError))
+                    if isinstance(event, int):
+                        customer_cache.observe_seq(event)
+                        try:
+                            await self._follow_change(event)
+                        except (BackendUnavailable, httpx.HTTPError):
+                            failed = True
+                        except Exception as e:
+                            print(f"Customer changes not applied: {e}")
+                    if failed:
+                        # Without the events, the data shown may get outdated:
+                        async with self:
+                            self.backend_stale = True
+        finally:
+            if _change_watchers.get(client_token) is watcher:
+                del _change_watchers[client_token]
+
+    def stop_watching_changes(self):
+        """Stop the change watcher of this client."""
+        watcher = _change_watchers.pop(self.router.session.client_token, None)
+        if watcher is not None:
+            watcher.cancel()
+
+    async def next_page(self):
+        if self.has_next_page:
+            self.page += 1
+            return await self._reload_page()
+
+    async def previous_page(self):
+        if self.page > 0:
+            self.page -= 1
+            return await self._reload_page()
+
+    async def set_page_size(self, page_size: str):
+        # Keep the first visible row on the new page:
+        first_row = self.page * self.page_size
+        self.page_size = int(page_size)
+        self.page = first_row // self.page_size
+        return await self._reload_page()
 
     def get_user(self, user: Customer):
+        """Open the edit dialog for a customer."""
         self.current_user = user
+        self.edit_dialog_open = True
+
+    def set_edit_dialog_open(self, open: bool):
+        self.edit_dialog_open = open
+
+    @rx.var(cache=True)
+    def page_count(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+    @rx.var(cache=True)
+    def has_previous_page(self) -> bool:
+        return self.page > 0
+
+    @rx.var(cache=True)
+    def has_next_page(self) -> bool:
+        return (self.page + 1) * self.page_size < self.total
 
     @rx.var(cache=True)
     def payments_change(self) -> float:
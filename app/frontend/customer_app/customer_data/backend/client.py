@@ -0,0 +1,265 @@
+"""
+Shared HTTP client for the calls from the Reflex state to the FastAPI backend.
+
+Each Reflex worker process keeps a single httpx.AsyncClient, so the sessions it
+serves reuse warm keep-alive connections instead of opening one per call.
+
+With 'fastapi_in_process' enabled, the client calls the FastAPI app directly
+through an ASGI transport: same code, no socket, no HTTP hop.
+
+The State calls the backend through 'backend_request', which bounds each call with
+a deadline, retries idempotent calls, and fails fast while the backend is down.
+"""
+
+import asyncio
+import contextlib
+import importlib
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from ..config import settings
+
+# Root of the project, containing the 'app' package of the FastAPI backend:
+PROJECT_ROOT = Path(__file__).resolve().parents[5]
+
+# Host used in the URLs of in-process requests. It is never resolved.
+IN_PROCESS_BASE_URL = "http://fastapi.internal"
+
+# Methods that can be retried without side effects:
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Responses of a backend (or of its proxy) that is down or overloaded:
+UNAVAILABLE_STATUS_CODES = {502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+_fastapi_app = None
+
+
+class BackendUnavailable(Exception):
+    """The FastAPI backend did not answer a call in time, or calls to it are suspended."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the backend is failing, instead of tying up the worker.
+
+    After 'failure_threshold' consecutive failures, the circuit opens: calls fail
+    immediately for 'reset_timeout' seconds. Then a single trial call is let through
+    (half-open): its success closes the circuit, and its failure opens it again.
+
+    Args:
+        failure_threshold (int): The number of consecutive failures opening the circuit.
+        reset_timeout (float): The time the circuit stays open, in seconds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._trial_running:
+            return False
+        self._trial_running = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def release_trial(self):
+        """End a call that neither succeeded nor failed, e.g. a cancelled one."""
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+circuit_breaker = CircuitBreaker(
+    settings.circuit_failure_threshold, settings.circuit_reset_timeout
+)
+
+
+def import_backend_object(path: str):
+    """Import an object of the FastAPI backend, named as 'module:attribute'."""
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.append(str(PROJECT_ROOT))
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+def get_fastapi_app():
+    """Import the FastAPI app named by 'settings.fastapi_app' (as 'module:attribute')."""
+    global _fastapi_app
+
+    if _fastapi_app is None:
+        _fastapi_app = import_backend_object(settings.fastapi_app)
+    return _fastapi_app
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the HTTP client of this worker, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        if settings.fastapi_in_process:
+            transport = httpx.ASGITransport(app=get_fastapi_app())
+            base_url = IN_PROCESS_BASE_URL
+            # Compressing responses only to decompress them in the same process wastes
+            # the CPU the in-process calls save:
+            headers = {"Accept-Encoding": "identity"}
+        else:
+            transport = None
+            base_url = settings.fastapi_host
+            headers = None
+
+        _client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.http_timeout, connect=settings.http_connect_timeout
+            ),
+        )
+    return _client
+
+
+async def backend_request(
+    method: str,
+    url: str,
+    deadline: Optional[float] = None,
+    retries: Optional[int] = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Call the FastAPI backend with the shared client, within a deadline.
+
+    Idempotent calls are retried on connection errors and 502/503/504 responses, with
+    jittered exponential backoff, as long as the deadline allows.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL, relative to the backend host.
+        deadline (float, optional): The deadline of the call, retries included, in seconds.
+            Defaults to settings.http_deadline.
+        retries (int, optional): The maximum number of retries. Defaults to
+            settings.http_retries for idempotent methods, and 0 for the others.
+        **kwargs: The arguments of httpx.AsyncClient.request (params, json, ...).
+
+    Returns:
+        httpx.Response: The response of the backend.
+
+    Raises:
+        BackendUnavailable: If no response arrived within the deadline, or the circuit
+            breaker is open.
+    """
+    method = method.upper()
+    if deadline is None:
+        deadline = settings.http_deadline
+    if retries is None:
+        retries = settings.http_retries if method in IDEMPOTENT_METHODS else 0
+
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + deadline
+    attempt = 0
+
+    while True:
+        if not circuit_breaker.allow():
+            raise BackendUnavailable("The backend is unavailable, try again later")
+
+        response, error = None, None
+        try:
+            response = await asyncio.wait_for(
+                get_client().request(method, url, **kwargs),
+                max(expires_at - loop.time(), 0),
+            )
+        except (httpx.TransportError, asyncio.TimeoutError) as e:
+            error = e
+        except asyncio.CancelledError:
+            # The trial of a half-open circuit must end, or no call is ever allowed:
+            circuit_breaker.release_trial()
+            raise
+        except BaseException:
+            # E.g. an undecodable response, or an error of the app run in-process:
+            circuit_breaker.record_failure()
+            raise
+
+        if response is not None and response.status_code not in UNAVAILABLE_STATUS_CODES:
+            circuit_breaker.record_success()
+            return response
+        circuit_breaker.record_failure()
+
+        attempt += 1
+        backoff = random.uniform(
+            0,
+            min(
+                settings.http_retry_backoff_max,
+                settings.http_retry_backoff * 2**attempt,
+            ),
+        )
+        if attempt > retries or loop.time() + backoff >= expires_at:
+            if response is not None:
+                return response
+            raise BackendUnavailable(
+                f"The backend did not answer {method} {url}: {error!r}"
+            ) from error
+        await asyncio.sleep(backoff)
+
+
+async def close_client():
+    """Close the HTTP client of this worker and its pooled connections."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@contextlib.asynccontextmanager
+async def http_client_lifespan():
+    """
+    Reflex lifespan task opening the HTTP client at startup, and closing it at shutdown.
+
+    In-process, it also runs the startup and shutdown handlers of the FastAPI app
+    (database initialisation, ...), which the ASGI transport does not trigger.
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        if settings.fastapi_in_process:
+            fastapi_app = get_fastapi_app()
+            await stack.enter_async_context(
+                fastapi_app.router.lifespan_context(fastapi_app)
+            )
+
+        get_client()
+        try:
+            yield
+        finally:
+            await close_client()
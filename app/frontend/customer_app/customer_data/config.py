@@ -10,6 +10,33 @@ class Settings(BaseSettings):
 
     fastapi_host: str
 
+    # Connection pool of the HTTP client shared by the sessions of a Reflex worker:
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+
+    # Timeouts of the calls to the FastAPI backend, in seconds:
+    http_connect_timeout: float = 5.0
+    http_timeout: float = 30.0
+
+    # Deadline of a backend call, retries included, in seconds:
+    http_deadline: float = 10.0
+    # Retries of idempotent calls (GET) on connection errors and 502/503/504 responses,
+    # after a random delay of up to 'backoff * 2 ** attempt' seconds, capped at 'max':
+    http_retries: int = 2
+    http_retry_backoff: float = 0.2
+    http_retry_backoff_max: float = 2.0
+
+    # Circuit breaker: after this many consecutive failed calls, calls fail immediately
+    # for 'reset_timeout' seconds, before a trial call is let through:
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+
+    # Call the FastAPI app in-process, through an ASGI transport, instead of over HTTP.
+    # Only for deployments where Reflex and FastAPI share the same host and checkout:
+    fastapi_in_process: bool = False
+    fastapi_app: str = "app.backend.main:app"
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
@@ -4,6 +4,7 @@ Customer data app.
 
 import reflex as rx
 
+from .backend.client import http_client_lifespan
 from .pages.contact import contact_page
 from .pages.dashboard import dashboard_page
 from .pages.login import login_page
@@ -18,3 +19,6 @@ app = rx.App(
         scaling="90%",
     ),
 )
+
+# Open the shared HTTP client to the FastAPI backend with the worker, and close it on shutdown.
+app.register_lifespan_task(http_client_lifespan)
@@ -2,14 +2,14 @@
 
 import re
 
-import httpx
 import reflex as rx
 
-from ..config import settings
+from ..backend.client import backend_request
 from .base import State
 from .models import User
 
-BASE_URL = f"{settings.fastapi_host}/api/v1"
+# Prefix of the FastAPI authentication endpoints, relative to settings.fastapi_host.
+BASE_URL = "/api/v1"
 
 
 class AuthState(State):
@@ -51,7 +51,7 @@ class AuthState(State):
 
         return False
 
-    def signup(self):
+    async def signup(self):
         """Sign up a user."""
 
         # If name is empty, return an error toast.
@@ -88,7 +88,8 @@ class AuthState(State):
         ]
 
         try:
-            response = httpx.post(
+            response = await backend_request(
+                "POST",
                 f"{BASE_URL}/users",
                 json=data,
             )
@@ -111,7 +112,7 @@ class AuthState(State):
             )
             return rx.toast.error(error_message, close_button=True)
 
-    def login(self):
+    async def login(self):
         """Log in a user."""
 
         # If email is empty, return an error toast.
@@ -125,7 +126,8 @@ class AuthState(State):
         # Make the API request
         data = {"email": self.email, "password": self.password}
         try:
-            response = httpx.post(
+            response = await backend_request(
+                "POST",
                 f"{BASE_URL}/auth/login",
                 json=data,
             )
@@ -1,6 +1,6 @@
 import reflex as rx
 
-from ..backend.backend import Customer, State
+from ..backend.backend import PAGE_SIZES, Customer, State
 from ..components.form_field import form_field
 from ..components.status_badges import status_badge
 
@@ -25,7 +25,14 @@ def show_customer(user: Customer):
         ),
         rx.table.cell(
             rx.hstack(
-                update_customer_dialog(user),
+                rx.button(
+                    rx.icon("square-pen", size=22),
+                    rx.text("Edit", size="3"),
+                    color_scheme="blue",
+                    size="2",
+                    variant="solid",
+                    on_click=lambda: State.get_user(user),
+                ),
                 rx.icon_button(
                     rx.icon("trash-2", size=22),
                     on_click=lambda: State.delete_customer(user.id),
@@ -172,18 +179,10 @@ def add_customer_button() -> rx.Component:
     )
 
 
-def update_customer_dialog(user):
+def update_customer_dialog():
+    """A single edit dialog for the table, showing State.current_user."""
+    user = State.current_user
     return rx.dialog.root(
-        rx.dialog.trigger(
-            rx.button(
-                rx.icon("square-pen", size=22),
-                rx.text("Edit", size="3"),
-                color_scheme="blue",
-                size="2",
-                variant="solid",
-                on_click=lambda: State.get_user(user),
-            ),
-        ),
         rx.dialog.content(
             rx.hstack(
                 rx.badge(
@@ -300,6 +299,8 @@ def update_customer_dialog(user):
                     ),
                     on_submit=State.update_customer_to_db,
                     reset_on_submit=False,
+                    # Remount the form, and its default values, for each customer:
+                    key=user.id,
                 ),
                 width="100%",
                 direction="column",
@@ -310,6 +311,51 @@ def update_customer_dialog(user):
             border=f"2px solid {rx.color('accent', 7)}",
             border_radius="25px",
         ),
+        open=State.edit_dialog_open,
+        on_open_change=State.set_edit_dialog_open,
+    )
+
+
+def pagination_controls():
+    return rx.flex(
+        rx.text(f"{State.total} customers", size="3", color=rx.color("gray", 11)),
+        rx.cond(
+            State.backend_stale,
+            rx.badge(
+                rx.icon("cloud-off", size=14),
+                "Backend unavailable, showing cached data",
+                color_scheme="orange",
+                variant="soft",
+                size="2",
+            ),
+        ),
+        rx.spacer(),
+        rx.select(
+            PAGE_SIZES,
+            value=State.page_size.to(str),
+            size="2",
+            on_change=State.set_page_size,
+        ),
+        rx.icon_button(
+            rx.icon("chevron-left", size=20),
+            on_click=State.previous_page,
+            disabled=~State.has_previous_page,
+            size="2",
+            variant="soft",
+        ),
+        rx.text(f"Page {State.page + 1} of {State.page_count}", size="3"),
+        rx.icon_button(
+            rx.icon("chevron-right", size=20),
+            on_click=State.next_page,
+            disabled=~State.has_next_page,
+            size="2",
+            variant="soft",
+        ),
+        justify="end",
+        align="center",
+        spacing="3",
+        width="100%",
+        padding_top="1em",
     )
 
 
@@ -385,6 +431,9 @@ def main_table():
             variant="surface",
             size="3",
             width="100%",
-            on_mount=State.load_entries,
+            on_mount=[State.load_entries, State.watch_changes],
+            on_unmount=State.stop_watching_changes,
         ),
+        pagination_controls(),
+        update_customer_dialog(),
     )
@@ -3,12 +3,14 @@ This module contains the router for the 'about' page.
 This is to demonstrate FastAPI rendering HTML templates for an existing page/route.
 """
 
+from pathlib import Path
+
 from fastapi import APIRouter, Request, status
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/frontend/templates")
+templates = Jinja2Templates(directory=Path(__file__).parents[1] / "templates")
 
 
 @router.get("/about/", response_class=HTMLResponse, include_in_schema=False)
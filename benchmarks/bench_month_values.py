@@ -0,0 +1,235 @@
+"""
+Benchmark of the computation of the dashboard month values.
+
+Compares, on the same generated customers:
+
+1. The original client-side computation: two scans of every customer, each parsing
+   every date with 'datetime.strptime'.
+2. A single pass computing both periods together, comparing the ISO date strings.
+3. The same, vectorized with pandas (if installed).
+4. The SQL aggregate of the '/api/customers/stats' endpoint, without and with the
+   covering index of the stats. The index pays off as the history of customers grows
+   beyond the periods of the stats (see '--years').
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_month_values [--rows 100000] [--years 2] [--repeat 5]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple
+
+from fastapi import Response
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.backend.customer.models import Customer
+from app.backend.customer.routes import get_customer_stats
+
+try:
+    import pandas
+except ImportError:  # pandas is optional.
+    pandas = None
+
+STATUSES = ["Delivered", "Pending", "Cancelled"]
+
+
+class Row(NamedTuple):
+    date: str
+    payments: float
+    status: str
+
+
+def generate_rows(count: int, years: int, now: datetime) -> list[Row]:
+    """Generate customers dated over the last years."""
+    random.seed(0)
+    days = 365 * years
+    return [
+        Row(
+            date=(now - timedelta(days=random.randrange(days))).strftime("%Y-%m-%d"),
+            payments=round(random.uniform(10, 1000), 2),
+            status=random.choice(STATUSES),
+        )
+        for _ in range(count)
+    ]
+
+
+def get_windows(now: datetime) -> tuple[datetime, datetime, datetime]:
+    start_of_month = datetime(now.year, 1, 1)
+    last_day_of_last_month = start_of_month - timedelta(days=1)
+    start_of_last_month = last_day_of_last_month.replace(day=1)
+    return start_of_month, start_of_last_month, last_day_of_last_month
+
+
+def two_scans(rows: list[Row], now: datetime) -> tuple:
+    """The original computation: one scan per period, parsing every date."""
+    start_of_month, start_of_last_month, last_day_of_last_month = get_windows(now)
+
+    current = [
+        row for row in rows if datetime.strptime(row.date, "%Y-%m-%d") >= start_of_month
+    ]
+    previous = [
+        row
+        for row in rows
+        if start_of_last_month
+        <= datetime.strptime(row.date, "%Y-%m-%d")
+        <= last_day_of_last_month
+    ]
+    return tuple(
+        (
+            len(users),
+            sum(user.payments for user in users),
+            len([user for user in users if user.status == "Delivered"]),
+        )
+        for users in (current, previous)
+    )
+
+
+def single_pass(rows: list[Row], now: datetime) -> tuple:
+    """One scan for both periods, comparing ISO date strings instead of parsing them."""
+    start_of_month, start_of_last_month, last_day_of_last_month = (
+        day.strftime("%Y-%m-%d") for day in get_windows(now)
+    )
+
+    values = {"current": [0, 0.0, 0], "previous": [0, 0.0, 0]}
+    for row in rows:
+        if row.date >= start_of_month:
+            period = values["current"]
+        elif start_of_last_month <= row.date <= last_day_of_last_month:
+            period = values["previous"]
+        else:
+            continue
+        period[0] += 1
+        period[1] += row.payments
+        if row.status == "Delivered":
+            period[2] += 1
+    return tuple(tuple(period) for period in values.values())
+
+
+def vectorized(frame, now: datetime) -> tuple:
+    """Both periods from boolean masks over a pandas DataFrame, dates parsed once."""
+    start_of_month, start_of_last_month, last_day_of_last_month = get_windows(now)
+
+    dates = pandas.to_datetime(frame["date"], format="%Y-%m-%d")
+    delivered = frame["status"] == "Delivered"
+    result = []
+    for mask in (
+        dates >= start_of_month,
+        (dates >= start_of_last_month) & (dates <= last_day_of_last_month),
+    ):
+        result.append(
+            (
+                int(mask.sum()),
+                float(frame["payments"][mask].sum()),
+                int((mask & delivered).sum()),
+            )
+        )
+    return tuple(result)
+
+
+def sql_aggregate(engine) -> tuple:
+    """The '/api/customers/stats' endpoint, called directly."""
+    with Session(engine) as session:
+        stats = get_customer_stats(Response(), session=session, search=None)
+    return tuple(
+        (values.num_customers, values.total_payments, values.num_delivers)
+        for values in (stats.current, stats.previous)
+    )
+
+
+def create_database(path: Path, rows: list[Row]):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            Customer.__table__.insert(),
+            [
+                {
+                    "name": f"Customer {index}",
+                    "email": f"customer{index}@example.com",
+                    "phone": "555-0100",
+                    "address": "1 Main Street",
+                    "date": row.date,
+                    "payments": row.payments,
+                    "status": row.status,
+                    "seq": 0,
+                }
+                for index, row in enumerate(rows)
+            ],
+        )
+    return engine
+
+
+def measure(function, *args, repeat: int) -> tuple[float, tuple]:
+    """Return the best time of 'repeat' calls, in milliseconds, and the result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def rounded(result: tuple) -> tuple:
+    return tuple(
+        (count, round(total, 2), delivered) for count, total, delivered in result
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    rows = generate_rows(args.rows, args.years, now)
+
+    benchmarks = [
+        ("two scans, strptime (original)", two_scans, rows, now),
+        ("single pass, ISO strings", single_pass, rows, now),
+    ]
+    if pandas is not None:
+        frame = pandas.DataFrame(rows, columns=Row._fields)
+        benchmarks.append(("single pass, pandas", vectorized, frame, now))
+
+    timings = [
+        (name, *measure(function, *function_args, repeat=args.repeat))
+        for name, function, *function_args in benchmarks
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database(Path(directory) / "customers.db", rows)
+        stats_index = next(
+            index
+            for index in Customer.__table__.indexes
+            if index.name == "ix_customer_stats"
+        )
+
+        stats_index.drop(engine)
+        name = "SQL aggregate, no index"
+        timings.append((name, *measure(sql_aggregate, engine, repeat=args.repeat)))
+
+        stats_index.create(engine)
+        name = "SQL aggregate, stats index"
+        timings.append((name, *measure(sql_aggregate, engine, repeat=args.repeat)))
+        engine.dispose()
+
+    expected = rounded(timings[0][2])
+    baseline = timings[0][1]
+    print(
+        f"Month values of {args.rows:,} customers over {args.years} years"
+        f" (best of {args.repeat}):"
+    )
+    for name, milliseconds, result in timings:
+        assert rounded(result) == expected, f"{name}: {result} != {expected}"
+        print(f"  {name:<32} {milliseconds:>9.2f} ms  {baseline / milliseconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
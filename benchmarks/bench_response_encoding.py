@@ -0,0 +1,186 @@
+"""
+Benchmark of the encoding of the '/api/customers' responses.
+
+Compares, on the same generated customers, the time from the query to the encoded
+body, and the size of the body:
+
+1. Customer models, converted with 'jsonable_encoder' and encoded with the standard
+   library 'json', as FastAPI does for the routes without a response model.
+2. The same models, validated and serialized by their response model, as FastAPI did
+   for 'response_model=List[Customer]' (the original path), encoded with 'json' or
+   with orjson.
+3. The selected columns, converted in bulk without validation (as '/api/customers'
+   does now), as one object per customer or one array per column, encoded with
+   orjson (if installed) or as MessagePack (if installed).
+
+Usage (from the project root):
+
+    python -m benchmarks.bench_response_encoding [--rows 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.backend.api.responses import encode_json
+from app.backend.customer.models import Customer
+from app.backend.customer.routes import customer_columns, customer_content
+
+try:
+    import orjson
+except ImportError:  # orjson is optional.
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional.
+    msgpack = None
+
+STATUSES = ["Delivered", "Pending", "Cancelled"]
+
+
+def create_database(path: Path, count: int):
+    """Create a database of generated customers."""
+    random.seed(0)
+    today = date.today()
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            Customer.__table__.insert(),
+            [
+                {
+                    "id": index,
+                    "name": f"Customer {index}",
+                    "email": f"customer{index}@example.com",
+                    "phone": "555-0100",
+                    "address": f"{index} Main Street",
+                    "date": today - timedelta(days=random.randrange(730)),
+                    "payments": round(random.uniform(10, 1000), 2),
+                    "status": random.choice(STATUSES),
+                    "seq": index,
+                    "version": 1,
+                }
+                for index in range(1, count + 1)
+            ],
+        )
+    return engine
+
+
+def stdlib_json(content) -> bytes:
+    """Encode JSON as Starlette's JSONResponse does."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+customers_adapter = TypeAdapter(List[Customer])
+
+
+def models_jsonable_encoder(session: Session) -> bytes:
+    """The original path, for responses without a response model."""
+    customers = session.exec(select(Customer)).all()
+    return stdlib_json(jsonable_encoder(customers))
+
+
+def models_response_model(session: Session, encode) -> bytes:
+    """The path of 'response_model=List[Customer]': validate, then serialize."""
+    customers = session.exec(select(Customer)).all()
+    validated = customers_adapter.validate_python(
+        [customer.model_dump() for customer in customers]
+    )
+    return encode(customers_adapter.dump_python(validated, mode="json"))
+
+
+def selected_columns(session: Session, response_format: str, encode) -> bytes:
+    """The path of '/api/customers': selected columns, converted in bulk."""
+    columns = customer_columns(None)
+    rows = session.execute(select(*columns)).all()
+    return encode(customer_content(columns, rows, response_format))
+
+
+def decode(body: bytes) -> list:
+    """Decode a body to one dict per customer, to compare the outputs."""
+    try:
+        content = json.loads(body)
+    except ValueError:
+        content = msgpack.unpackb(body)
+    if isinstance(content, dict):
+        columns = content["columns"]
+        content = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return content
+
+
+def measure(function, *args, repeat: int) -> tuple[float, bytes]:
+    """Return the best time of 'repeat' calls, in milliseconds, and the result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(engine, count: int, repeat: int):
+    benchmarks = [
+        ("models, jsonable_encoder, json", models_jsonable_encoder),
+        ("response model, json (original)", models_response_model, stdlib_json),
+    ]
+    if orjson is not None:
+        benchmarks.append(
+            ("response model, orjson", models_response_model, orjson.dumps)
+        )
+    benchmarks.append(("columns, rows, json", selected_columns, "rows", stdlib_json))
+    if orjson is not None:
+        benchmarks += [
+            ("columns, rows, orjson", selected_columns, "rows", encode_json),
+            ("columns, columnar, orjson", selected_columns, "columnar", encode_json),
+        ]
+    if msgpack is not None:
+        benchmarks += [
+            ("columns, rows, msgpack", selected_columns, "rows", msgpack.packb),
+            ("columns, columnar, msgpack", selected_columns, "columnar", msgpack.packb),
+        ]
+
+    with Session(engine) as session:
+        timings = [
+            (name, *measure(function, session, *function_args, repeat=repeat))
+            for name, function, *function_args in benchmarks
+        ]
+
+    expected = decode(timings[1][2])
+    baseline = timings[1][1]
+    print(f"Encoding of {count:,} customers (best of {repeat}):")
+    print(f"  {'':<34} {'ms':>9} {'us/row':>8} {'bytes/row':>10} {'speedup':>8}")
+    for name, milliseconds, body in timings:
+        assert decode(body) == expected, f"{name}: different output"
+        print(
+            f"  {name:<34} {milliseconds:>9.1f} {milliseconds * 1000 / count:>8.2f}"
+            f" {len(body) / count:>10.1f} {baseline / milliseconds:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.rows:
+            engine = create_database(Path(directory) / f"customers_{count}.db", count)
+            run(engine, count, args.repeat)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
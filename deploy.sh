@@ -19,6 +19,12 @@ cd app/frontend/customer_app/ || exit
 # Run Reflex export command (frontend-only)
 reflex export --no-zip --frontend-only
 
+# Navigate back to the project directory
+cd ../../../ || exit
+
+# Write the precompressed (.br/.gz) copies of the exported static files
+python -m app.backend.static_files.precompress app/frontend/customer_app/.web/_static
+
 # Restart the services
 sudo systemctl restart fastapi-reflex reflex-backend
 